@@ -0,0 +1,130 @@
+from abc import ABC, abstractmethod
+from typing import Callable, Dict, Type
+
+# ability name -> effect type, filled in by @register
+ABILITY_EFFECTS: Dict[str, Type['AbilityEffect']] = {}
+
+
+def register(name: str) -> Callable[[Type['AbilityEffect']], Type['AbilityEffect']]:
+    """Class decorator plugging an effect type in for every special ability called `name`"""
+    def decorate(effect_type: Type['AbilityEffect']) -> Type['AbilityEffect']:
+        ABILITY_EFFECTS[name] = effect_type
+        return effect_type
+    return decorate
+
+
+def compile_ability(ability) -> 'AbilityEffect':
+    """The effect of a SpecialAbility with its parameters bound, done once when the ability is loaded"""
+    return ABILITY_EFFECTS.get(ability.name, UnknownAbility)(ability)
+
+
+class AbilityEffect(ABC):
+    """A special ability ready to cast.
+
+    Calling it with (battlefield, caster, target) applies the ability and
+    returns a summary of what it did; mp has already been paid by
+    SpecialAbilityHandler.execute. The effect is bound to its ability, so
+    casting never searches the caster's abilities again, and reads the
+    ability's value at cast time like the mp cost is.
+    """
+
+    __slots__ = ('ability',)
+
+    def __init__(self, ability):
+        self.ability = ability
+
+    @property
+    def jutsu_name(self) -> str:
+        return self.ability.jutsu_name
+
+    @property
+    def value(self):
+        return self.ability.value
+
+    @abstractmethod
+    def __call__(self, battlefield, caster, target) -> dict:
+        """Apply the ability and return a summary of what it did"""
+
+
+class UnknownAbility(AbilityEffect):
+    __slots__ = ()
+
+    def __call__(self, battlefield, caster, target):
+        raise ValueError(f"Special ability '{self.ability.name}' is not implemented.")
+
+
+@register('evasion')
+class Evasion(AbilityEffect):
+    __slots__ = ()
+
+    def __call__(self, battlefield, caster, target):
+        duration = 1  # active until the next attack
+        battlefield.apply_status_effect(caster, "evasion", caster, self.ability)
+        battlefield.emit("evasion", caster.name, None, self.jutsu_name, duration)
+        return {"effect": "evasion", "duration": duration}
+
+
+@register('critical strike')
+class CriticalStrike(AbilityEffect):
+    __slots__ = ()
+
+    def __call__(self, battlefield, caster, target):
+        extra_damage = caster.get_attribute("dmg") * self.value
+        target.modify_attribute("hp", -extra_damage)
+        battlefield.emit("critical_strike", caster.name, target.name, self.jutsu_name, extra_damage)
+        return {"effect": "critical strike", "extra_damage": extra_damage}
+
+
+@register('poison')
+class Poison(AbilityEffect):
+    __slots__ = ()
+
+    def __call__(self, battlefield, caster, target):
+        poison_damage = 10
+        duration = 3
+        battlefield.apply_status_effect(caster, "poison", target, self.ability)
+        battlefield.emit("poison", caster.name, target.name, self.jutsu_name, duration, poison_damage)
+        return {"effect": "poison", "damage": poison_damage, "duration": duration}
+
+
+@register('stun')
+class Stun(AbilityEffect):
+    __slots__ = ()
+
+    def __call__(self, battlefield, caster, target):
+        duration = 1
+        battlefield.apply_status_effect(caster, "stun", target, self.ability)
+        battlefield.emit("stun", caster.name, target.name, self.jutsu_name)
+        return {"effect": "stun", "duration": duration}
+
+
+@register('heal self')
+class HealSelf(AbilityEffect):
+    __slots__ = ()
+
+    def __call__(self, battlefield, caster, target):
+        caster.modify_attribute("hp", self.value)
+        battlefield.emit("heal_self", caster.name, None, self.jutsu_name, self.value)
+        return {"effect": "heal self", "heal_amount": self.value}
+
+
+@register('heal others')
+class HealOthers(AbilityEffect):
+    __slots__ = ()
+
+    def __call__(self, battlefield, caster, target):
+        caster_team = battlefield.get_team_by_player(caster)
+        target = min(caster_team, key=lambda x: x.get_attribute("hp"))
+        target.modify_attribute("hp", self.value)
+        battlefield.emit("heal_others", caster.name, target.name, self.jutsu_name, self.value)
+        return {"effect": "heal others", "heal_amount": self.value}
+
+
+@register('buff')
+class Buff(AbilityEffect):
+    __slots__ = ()
+
+    def __call__(self, battlefield, caster, target):
+        caster.modify_attribute("armor", self.value)
+        battlefield.emit("buff", caster.name, None, self.jutsu_name, self.value)
+        return {"effect": "buff", "buff_amount": self.value}
@@ -0,0 +1,85 @@
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from quart import Quart, Response, render_template, jsonify, request, session
+from battle_service import SSE_END, SSE_HEADERS, find_battle, index_context, next_turn_delta, replace_session_battle, \
+    request_cursor, session_battle, snapshot, sse_message, stream_for
+import asyncio
+import os
+
+# ASGI front end of the battle web UI, serves the same routes as web_ui.
+# Run it with any ASGI server, e.g. `hypercorn asgi_app:app` or `uvicorn asgi_app:app`.
+#
+# Turns are CPU bound and battles take their lock while a turn is played, so
+# every call into battle_service runs on a bounded worker pool and the event
+# loop only shuffles requests and stream messages. Spectators are read
+# asynchronously and hold no thread while waiting for the next turn.
+
+app = Quart(__name__)
+# sessions only carry the battle id; set BATTLE_SECRET_KEY to keep them valid across restarts
+app.secret_key = os.environ.get('BATTLE_SECRET_KEY') or os.urandom(24)
+
+turn_workers = ThreadPoolExecutor(max_workers=int(os.environ.get('BATTLE_TURN_WORKERS', os.cpu_count() or 4)),
+                                  thread_name_prefix='battle-turn')
+
+
+async def run_blocking(function, *args):
+    """Run a battle_service call on the turn workers"""
+    return await asyncio.get_running_loop().run_in_executor(turn_workers, partial(function, *args))
+
+
+async def current_battle():
+    """The visitor's battle session, starting a battle if they have none (or it was evicted)"""
+    # the worker threads don't see the request context, hand them the session itself
+    return await run_blocking(session_battle, session._get_current_object())
+
+
+@app.route('/')
+async def index():
+    context = await run_blocking(index_context, await current_battle())
+    return await render_template("index.html", **context)
+
+
+@app.route('/new_battle', methods=['POST'])
+async def new_battle():
+    battle = await run_blocking(replace_session_battle, session._get_current_object())
+    return jsonify({"battle_id": battle.battle_id})
+
+
+@app.route('/state')
+async def state():
+    """Full snapshot, for first loads and reconnects"""
+    return jsonify(await run_blocking(snapshot, await current_battle()))
+
+
+@app.route('/next_turn', methods=['POST'])
+async def next_turn():
+    """Play a turn and return what changed since the client's cursor, see web_ui.next_turn"""
+    cursor = request_cursor(await request.get_json(silent=True))
+    return jsonify(await run_blocking(next_turn_delta, await current_battle(), cursor))
+
+
+@app.route('/stream')
+async def stream():
+    """Server-Sent Events feed of an auto-played battle, see web_ui.stream"""
+    battle_id = request.args.get('battle')
+    battle = await run_blocking(find_battle, battle_id) if battle_id else await current_battle()
+    if battle is None:
+        return jsonify({"error": f"No battle {battle_id}"}), 404
+    battle_stream = await run_blocking(stream_for, battle)
+    subscriber = battle_stream.subscribe(loop=asyncio.get_running_loop())
+
+    async def events():
+        try:
+            async for payload in subscriber:
+                yield sse_message(payload).encode()
+            yield SSE_END.encode()
+        finally:
+            subscriber.close()
+
+    response = Response(events(), mimetype='text/event-stream', headers=SSE_HEADERS)
+    response.timeout = None  # the stream lasts as long as the battle
+    return response
+
+
+if __name__ == '__main__':
+    app.run(debug=True)
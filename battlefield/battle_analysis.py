@@ -0,0 +1,143 @@
+from typing import List, Optional, Set, Tuple
+
+import numpy as np
+
+HIGH_THREAT = 0.7  # enemies above this threat level project danger zones
+
+
+def threat_levels(hp: np.ndarray, dmg: np.ndarray, speed: np.ndarray) -> np.ndarray:
+    """Vectorized BattleAI._calculate_threat_level"""
+    return 0.3 * (hp / 1000) + 0.4 * (dmg / 300) + 0.3 * (speed / 500)
+
+
+def hp_fractions(hp: np.ndarray, base_hp: np.ndarray) -> np.ndarray:
+    """hp left as a fraction of the starting hp, 1 where a unit started without any"""
+    return np.divide(hp, base_hp, out=np.ones_like(hp), where=base_hp > 0)
+
+
+def _positions(characters: list) -> np.ndarray:
+    positions = np.zeros((len(characters), 2), dtype=np.int64)
+    for index, character in enumerate(characters):
+        positions[index] = character.position.x, character.position.y
+    return positions
+
+
+def _attributes(characters: list, name: str) -> np.ndarray:
+    return np.array([character.get_attribute(name) for character in characters], dtype=np.float64)
+
+
+def _team_versions(characters: list) -> Optional[Tuple[int, int]]:
+    """(positions_version, stats_version) of the team owning this member list, None if it isn't one"""
+    team = characters[0].team if characters else None
+    if team is None or team.characters is not characters:
+        return None
+    return team.positions_version, team.stats_version
+
+
+class BattlefieldAnalysis:
+    """Array snapshot of both sides of a grid battle, computed in one pass.
+
+    Holds unit positions and stats, enemy threat levels, the ally x enemy
+    Manhattan and Chebyshev distance matrices and a per-cell danger heatmap
+    (summed threat of the high-threat enemies whose attack range covers the
+    cell, indexed [y, x]). BattleAI heuristics read from it instead of looping
+    over units one pair at a time.
+
+    When built from Team member lists the snapshot can be kept up to date with
+    sync(), which only redoes the parts whose team version counters moved.
+    """
+
+    def __init__(self, allies: list, enemies: list, grid_size: Tuple[int, int]):
+        self._ally_source = allies
+        self._enemy_source = enemies
+        self._ally_versions = _team_versions(allies)
+        self._enemy_versions = _team_versions(enemies)
+        self.width, self.height = grid_size
+        self.enemies = list(enemies)
+        self._enemy_index = {id(enemy): index for index, enemy in enumerate(self.enemies)}
+        self.enemy_positions = _positions(self.enemies)
+        self.enemy_base_hp = np.array([enemy.base_attribute('hp') for enemy in self.enemies], dtype=np.float64)
+        self._high = self.enemy_range = None
+        self._load_enemy_stats()
+        self._load_allies()
+
+    def _load_enemy_stats(self):
+        self.enemy_hp = _attributes(self.enemies, 'hp')
+        self.enemy_hp_fraction = hp_fractions(self.enemy_hp, self.enemy_base_hp)
+        self.enemy_dmg = _attributes(self.enemies, 'dmg')
+        self.threat = threat_levels(self.enemy_hp, self.enemy_dmg, _attributes(self.enemies, 'speed'))
+        high = self.threat > HIGH_THREAT
+        enemy_range = _attributes(self.enemies, 'range').astype(np.int64)
+        if self._high is None or not np.array_equal(high, self._high) \
+                or not np.array_equal(enemy_range, self.enemy_range):
+            # the zones only change shape when an enemy crosses the threshold or its range changes
+            self._high, self.enemy_range = high, enemy_range
+            self._danger_zones: Optional[Set[Tuple[int, int]]] = None
+        # a cell is in an enemy's square when both its column and its row are within range,
+        # so the heatmap is a product of per-axis masks instead of one square per enemy
+        weights = np.where(high, self.threat, 0.0)
+        in_columns = np.abs(np.arange(self.width)[None, :] - self.enemy_positions[:, :1]) <= self.enemy_range[:, None]
+        in_rows = np.abs(np.arange(self.height)[None, :] - self.enemy_positions[:, 1:]) <= self.enemy_range[:, None]
+        self.danger = (in_rows * weights[:, None]).T @ in_columns
+
+    def _load_allies(self):
+        self.allies = list(self._ally_source)
+        self._ally_index = {id(ally): index for index, ally in enumerate(self.allies)}
+        self.ally_positions = _positions(self.allies)
+        delta = np.abs(self.ally_positions[:, None, :] - self.enemy_positions[None, :, :])
+        self.manhattan = delta.sum(2)
+        self.chebyshev = delta.max(2)
+        self.formation = None  # filled in by BattleAI, depends on ally positions only
+        self._occupied: Optional[Set[Tuple[int, int]]] = None
+
+    def sync(self, allies: list, enemies: list) -> bool:
+        """Catch up with changes to the teams, False if the snapshot has to be rebuilt instead"""
+        ally_versions, enemy_versions = _team_versions(allies), _team_versions(enemies)
+        if allies is not self._ally_source or enemies is not self._enemy_source \
+                or ally_versions is None or enemy_versions is None:
+            return False
+        if enemy_versions[0] != self._enemy_versions[0]:
+            # an enemy moved or left, everything derived from their positions is stale
+            return False
+        if enemy_versions[1] != self._enemy_versions[1]:
+            self._load_enemy_stats()
+        if ally_versions[0] != self._ally_versions[0]:
+            self._load_allies()
+        self._ally_versions, self._enemy_versions = ally_versions, enemy_versions
+        return True
+
+    def high_threats(self) -> List[Tuple[object, float]]:
+        """(enemy, threat level) of every enemy above HIGH_THREAT, in enemy order"""
+        return [(self.enemies[index], float(self.threat[index])) for index in np.flatnonzero(self._high)]
+
+    def danger_zones(self) -> Set[Tuple[int, int]]:
+        """Cells inside the range of at least one high-threat enemy, shared, don't modify it"""
+        if self._danger_zones is None:
+            ys, xs = np.nonzero(self.danger)
+            self._danger_zones = set(zip(xs.tolist(), ys.tolist()))
+        return self._danger_zones
+
+    def occupied_cells(self) -> Set[Tuple[int, int]]:
+        """Cells taken by either side, shared, don't modify it"""
+        if self._occupied is None:
+            self._occupied = set(map(tuple, self.enemy_positions.tolist()))
+            self._occupied.update(map(tuple, self.ally_positions.tolist()))
+        return self._occupied
+
+    def enemy_indices(self, enemies: list) -> np.ndarray:
+        return np.array([self._enemy_index[id(enemy)] for enemy in enemies], dtype=np.int64)
+
+    def distances_from(self, character, enemies: list = None) -> np.ndarray:
+        """Manhattan distance from a character to each enemy (all enemies, or the given subset)"""
+        row = self._ally_index.get(id(character))
+        if row is not None:
+            distances = self.manhattan[row]
+        else:
+            distances = np.abs(self.enemy_positions - (character.position.x, character.position.y)).sum(1)
+        if enemies is not None:
+            distances = distances[self.enemy_indices(enemies)]
+        return distances
+
+    def covers(self, enemies: list) -> bool:
+        """True when every given enemy is part of this snapshot"""
+        return all(id(enemy) in self._enemy_index for enemy in enemies)
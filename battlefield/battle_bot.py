@@ -3,6 +3,11 @@ import random
 from math import floor
 from typing import List, Tuple, Set, Optional
 from characters import Character, Position
+from rng import BattleRNG
+from neighborhoods import CHEBYSHEV, neighborhood, neighborhood_set
+from battle_analysis import BattlefieldAnalysis
+from pathfinding import PathPlanner
+import numpy as np
 
 
 def manhattan_distance(pos1: tuple, pos2: tuple) -> int:
@@ -17,8 +22,10 @@ class AIStrategy(Enum):
 
 
 class BattleAI:
-    def __init__(self, difficulty: str = "hard"):
+    def __init__(self, difficulty: str = "hard", rng: Optional[random.Random] = None):
         self.difficulty = difficulty.lower()
+        # each AI owns its stream so battles can be replayed from their seed
+        self.rng = rng if rng is not None else BattleRNG()
         # Different strategies per difficulty
         self.strategies = {
             "easy": [AIStrategy.RANDOM, AIStrategy.DEFENSIVE],
@@ -29,10 +36,15 @@ class BattleAI:
         self.memory = {}  # Remember past actions and their outcomes
         self.allies = []
         self.enemies = []
+        self.field: Optional[BattlefieldAnalysis] = None  # array snapshot from the last analyze_battlefield
+        # snapshots per (allies, enemies, grid size), synced with the teams' version counters so
+        # that every unit of a team reuses the threat, danger and formation work of the turn
+        self._analyses = {}
+        self.paths = PathPlanner()  # flow fields shared by every unit this AI moves in a turn
 
     def pick_strategy(self) -> AIStrategy:
         """Picks a strategy based on difficulty."""
-        return random.choice(self.strategies.get(self.difficulty, [AIStrategy.RANDOM]))
+        return self.rng.choice(self.strategies.get(self.difficulty, [AIStrategy.RANDOM]))
 
     def analyze_battlefield(self, character, allies: list, enemies: list, grid_size: tuple) -> dict:
         """Analyzes battlefield state and returns tactical information."""
@@ -47,29 +59,35 @@ class BattleAI:
         }
         self.allies = allies 
         self.enemies = enemies
-        # Identify immediate threats
-        for enemy in enemies:
-            threat_level = self._calculate_threat_level(enemy)
-            if threat_level > 0.7:  # High threat
-                analysis['threats'].append((enemy, threat_level))
-                # Mark danger zones around high-threat enemies
-                attack_range = self._get_attack_range(enemy)
-                analysis['danger_zones'].update(
-                    self._get_area_positions(enemy.position, attack_range))
+        field = self.field = self._analysis_for(allies, enemies, grid_size)
+        analysis['field'] = field
+        # Identify immediate threats, and the danger zones around them
+        analysis['threats'] = field.high_threats()
+        analysis['danger_zones'] = field.danger_zones()
 
         # Find tactical opportunities
-        for enemy in enemies:
-            if enemy.get_attribute('hp') < character.get_attribute('dmg') * 2:
+        finishing = field.enemy_hp < character.get_attribute('dmg') * 2
+        wounded = field.enemy_hp_fraction < 0.3
+        for index, enemy in enumerate(field.enemies):
+            if finishing[index]:
                 analysis['opportunities'].append(('finishing_blow', enemy))
-            elif enemy.get_attribute('hp') < enemy.get_attribute('hp') * 0.3:
+            elif wounded[index]:
                 analysis['opportunities'].append(('wounded_target', enemy))
 
         # Analyze team formation
-        ally_positions = [ally.position for ally in allies]
-        analysis['team_formation'] = self._analyze_formation(ally_positions)
+        if field.formation is None:
+            field.formation = self._analyze_formation(field.ally_positions)
+        analysis['team_formation'] = field.formation
 
         return analysis
 
+    def _analysis_for(self, allies: list, enemies: list, grid_size: tuple) -> BattlefieldAnalysis:
+        key = (id(allies), id(enemies), tuple(grid_size))
+        field = self._analyses.get(key)
+        if field is None or not field.sync(allies, enemies):
+            field = self._analyses[key] = BattlefieldAnalysis(allies, enemies, grid_size)
+        return field
+
     def _calculate_threat_level(self, character:Character) -> float:
         """Calculate how dangerous a character is based on their attributes."""
         hp_ratio = character.get_attribute('hp') / 1000  # Normalize HP
@@ -81,9 +99,7 @@ class BattleAI:
 
     def choose_move(self, character, allies: list, enemies: list, grid_size: tuple) -> tuple:
         """Choose next move based on current strategy and battlefield analysis."""
-        analysis = self.analyze_battlefield(
-            character, allies, enemies, grid_size)
-        print(analysis)
+        self.analyze_battlefield(character, allies, enemies, grid_size)
         enemy = self.choose_attack_target(character, enemies)
         if enemy is not None:
             return self._approach_and_optimize_move(character, enemy, grid_size), enemy
@@ -95,7 +111,7 @@ class BattleAI:
         """Decide what action to take (attack, heal, buff, etc.)."""
         if self.difficulty == "hard":
             # Consider multiple factors before deciding
-            if character.get_attribute('hp') < character.get_attribute('hp') * 0.3:
+            if character.get_attribute('hp') < character.base_attribute('hp') * 0.3:
                 # Try to heal if critically wounded
                 heal_ability = self._find_healing_ability(character)
                 if heal_ability:
@@ -120,24 +136,18 @@ class BattleAI:
         if not enemies:
             return None
 
-        target_scores = {}
-        for enemy in enemies:
-            score = 0
-            # Prioritize low HP targets
-            hp_percentage = enemy.get_attribute(
-                'hp') / enemy.get_attribute('hp')
-            score += (1 - hp_percentage) * 50
-
-            # Prioritize high-damage dealers
-            score += min(50, enemy.get_attribute('dmg') / 4)
+        field = self._field_for(enemies)
+        indices = field.enemy_indices(enemies)
+        # Prioritize low HP targets
+        scores = (1 - field.enemy_hp_fraction[indices]) * 50
 
-            # Prioritize healers or support characters
-            if self._is_support_character(enemy):
-                score += 30
+        # Prioritize high-damage dealers
+        scores += np.minimum(50, field.enemy_dmg[indices] / 4)
 
-            target_scores[enemy] = score
+        # Prioritize healers or support characters
+        scores += 30 * np.array([self._is_support_character(enemy) for enemy in enemies])
 
-        return max(target_scores.items(), key=lambda x: x[1])[0]
+        return enemies[int(scores.argmax())]
 
     def _is_support_character(self, character) -> bool:
         """Identify if a character is a support/healer type."""
@@ -164,20 +174,18 @@ class BattleAI:
         return character.get_attribute('range')
 
 
-    def _get_area_positions(self, center: tuple, radius: int) -> set:
-        """Get all grid positions within given Chebyshev distance (radius) of center point."""
-        positions = set()
-        x, y = center
-        for dx in range(-radius, radius + 1):
-            for dy in range(-radius, radius + 1):
-                if max(abs(dx), abs(dy)) <= radius:
-                    positions.add((x + dx, y + dy))
-        return positions
+    def _get_area_positions(self, center: tuple, radius: int, grid_size: Optional[tuple] = None) -> frozenset:
+        """Get all grid positions within given Chebyshev distance (radius) of center point.
 
+        Positions off a grid of grid_size are left out. The set is cached, don't modify it.
+        """
+        bounds = tuple(grid_size) if grid_size is not None else None
+        return neighborhood_set((center[0], center[1]), radius, CHEBYSHEV, bounds)
 
-    def _analyze_formation(self, positions: list) -> dict:
+
+    def _analyze_formation(self, positions) -> dict:
         """Analyze current team formation and suggest improvements."""
-        if not positions:
+        if len(positions) == 0:
             return None #type:ignore
 
         formation = {
@@ -188,22 +196,20 @@ class BattleAI:
         return formation
 
 
-    def _get_formation_center(self, positions: list) -> tuple:
-        """Calculate the center point of the formation."""
-        if not positions:
+    def _get_formation_center(self, positions) -> tuple:
+        """Calculate the center point of the formation, positions being (x, y) pairs or an (n, 2) array."""
+        if len(positions) == 0:
             return (0, 0)
-        x_avg = sum(p[0] for p in positions) / len(positions)
-        y_avg = sum(p[1] for p in positions) / len(positions)
+        x_avg, y_avg = np.asarray(positions, dtype=np.float64).mean(0)
         return (int(x_avg), int(y_avg))
 
 
-    def _get_formation_spread(self, positions: list) -> float:
+    def _get_formation_spread(self, positions) -> float:
         """Calculate how spread out the formation is."""
-        if not positions:
+        if len(positions) == 0:
             return 0
         center = self._get_formation_center(positions)
-        distances = [manhattan_distance(pos, center) for pos in positions]
-        return sum(distances) / len(distances)
+        return float(np.abs(np.asarray(positions) - center).sum(1).mean())
 
 
     def _determine_formation_type(self, positions: list) -> str:
@@ -220,26 +226,23 @@ class BattleAI:
             return "scattered"
 
 
-    def _get_possible_moves(self, character:Character, grid_size: tuple) -> set:
-        """Get all possible move positions for a character."""
+    def _get_possible_moves(self, character:Character, grid_size: tuple) -> list:
+        """Get all possible move positions for a character, in a fixed column-major order
+        so that ties between equally good moves are always broken the same way."""
         current_pos = character.position.x, character.position.y
         move_range = character.get_attribute('range')
-        possible = set()
-        occupied = [(i.position.x, i.position.y)
-                    for i in self.enemies] + [(i.position.x, i.position.y) for i in self.allies]
-
-        for dx in range(-move_range, move_range + 1):
-            for dy in range(-move_range, move_range + 1):
-                new_x = current_pos[0] + dx
-                new_y = current_pos[1] + dy
-                if 0 <= new_x < grid_size[0] and 0 <= new_y < grid_size[1]:
-                    possible.add((new_x, new_y))
-
-        #remove the current position from the list of possible moves
-        if current_pos in possible:
-            possible.remove(current_pos)
-        possible = {pos for pos in possible if pos not in occupied}
-        return possible
+        occupied = self._occupied_cells()
+        # the current position is never a move
+        possible = neighborhood(current_pos, move_range, CHEBYSHEV, tuple(grid_size), include_center=False)
+        return [pos for pos in possible if pos not in occupied]
+
+    def _occupied_cells(self) -> set:
+        """Cells taken by the units of the last analyzed battlefield, shared, don't modify it"""
+        if self.field is not None and self.field.sync(self.allies, self.enemies):
+            return self.field.occupied_cells()
+        occupied = {(i.position.x, i.position.y) for i in self.enemies}
+        occupied.update((i.position.x, i.position.y) for i in self.allies)
+        return occupied
 
     def move_towards(self, current: Tuple[int, int], target: Tuple[int, int]) -> Tuple[int, int]:
         """
@@ -271,7 +274,8 @@ class BattleAI:
                                       grid_size: tuple) -> Tuple[int, int]:
         """
         Always try to close the distance toward the nearest enemy.
-        If the enemy is far (more than attack_range + buffer), move directly toward it.
+        If the enemy is far (more than attack_range + buffer), follow the shortest free path
+        toward it until it is in attack range.
         Otherwise, when just outside of range, choose an optimized move based on difficulty.
         """
         current_pos = (character.position.x, character.position.y)
@@ -283,27 +287,31 @@ class BattleAI:
         enemy_pos = (enemy.position.x, enemy.position.y)
         current_distance = manhattan_distance(current_pos, enemy_pos)
 
-        # If enemy is far, take maximum steps toward enemy
+        # If enemy is far, take maximum steps toward enemy, around anything in the way
         if current_distance > attack_range + buffer:
-            new_pos = current_pos
-            for _ in range(character.range): #type:ignore
-                new_pos = self.move_towards(new_pos, enemy_pos)
-            # Ensure new position stays within grid boundaries
-            new_x = max(0, min(new_pos[0], grid_size[0] - 1))
-            new_y = max(0, min(new_pos[1], grid_size[1] - 1))
-            return (new_x, new_y)
+            path = self.paths.path(current_pos, enemy_pos, character.range, tuple(grid_size), #type:ignore
+                                   self._occupied_cells(), stop_distance=attack_range)
+            return path[-1] if path else current_pos
         else:
             # Enemy is close but just outside range; choose from moves that put you as near as possible.
             moves = self._get_possible_moves(character, grid_size)
-            # Filter moves that are within attack_range + buffer of enemy
-            valid_moves = [move for move in moves if manhattan_distance(
-                move, enemy_pos) <= attack_range + buffer]
-            if valid_moves:
-                # For "easy" and "medium", simply choose the move that minimizes distance.
-                # For "hard" you could extend this to consider threats/formation; here we choose minimum distance.
-                return min(valid_moves, key=lambda move: manhattan_distance(move, enemy_pos))
-            # Fallback: if no filtered move found, return a move that minimizes distance among all moves.
-            return min(moves, key=lambda move: manhattan_distance(move, enemy_pos))
+            if not moves:
+                return current_pos
+            distances = np.abs(np.array(moves) - enemy_pos).sum(1)
+            # The closest move is within attack_range + buffer of the enemy whenever any move is,
+            # so for every difficulty this is simply the move that minimizes distance (first on ties).
+            # For "hard" you could extend this to consider threats/formation.
+            return moves[int(distances.argmin())]
+
+    def _field_for(self, enemies: list) -> BattlefieldAnalysis:
+        """The last battlefield analysis, or a fresh one when it is stale or doesn't cover these enemies"""
+        if self.field is None or not self.field.sync(self.allies, self.enemies) or not self.field.covers(enemies):
+            # grid bounds only matter for the danger map, which target selection doesn't read
+            self.field = BattlefieldAnalysis(self.allies, enemies, (1, 1))
+        return self.field
+
+    def _distances_to(self, character, enemies: list) -> np.ndarray:
+        return self._field_for(enemies).distances_from(character, enemies)
 
     def _find_healing_ability(self, character) -> Optional[object]:
             """Find a healing ability if the character has one."""
@@ -316,8 +324,8 @@ class BattleAI:
     def _find_critical_ally(self, allies: list) -> Optional[object]:
         """Find an ally that needs immediate healing."""
         for ally in allies:
-            hp_ratio = ally.get_attribute('hp') / ally.get_attribute('hp')
-            if hp_ratio < 0.3:
+            base_hp = ally.base_attribute('hp')
+            if base_hp > 0 and ally.get_attribute('hp') / base_hp < 0.3:
                 return ally
         return None
 
@@ -333,17 +341,15 @@ class BattleAI:
             return None
 
         attack_range = self._get_attack_range(character)
-        in_range_enemies = [
-            enemy for enemy in enemies
-            if manhattan_distance(character.position, enemy.position) <= attack_range
-        ]
+        distances = self._distances_to(character, enemies)
+        in_range_enemies = [enemies[index] for index in np.flatnonzero(distances <= attack_range)]
 
         if not in_range_enemies:
             return None
 
         # In easy mode, choose random target
         if self.difficulty == "easy":
-            return random.choice(in_range_enemies)
+            return self.rng.choice(in_range_enemies)
 
         # Otherwise use priority targeting
         return self._identify_priority_target(in_range_enemies)
@@ -362,41 +368,29 @@ class BattleAI:
         if not valid_targets:
             return None
 
-        att_pos = (character.position.x, character.position.y)
+        field = self._field_for(valid_targets)
+        indices = field.enemy_indices(valid_targets)
+        distances = field.distances_from(character)[indices]
 
         if self.difficulty == "easy":
             # Weight each enemy by the inverse of its distance (closer enemies are more likely)
-            total_weight = sum(1 / (manhattan_distance(att_pos, (enemy.position.x, enemy.position.y)) + 1)
-                            for enemy in valid_targets)
-            r = random.uniform(0, total_weight)
-            cumulative = 0
-            for enemy in valid_targets:
-                weight = 1 / (manhattan_distance(att_pos,
-                            (enemy.position.x, enemy.position.y)) + 1)
-                cumulative += weight
-                if cumulative >= r:
-                    return enemy
-            return random.choice(valid_targets)
+            cumulative = np.cumsum(1 / (distances + 1))
+            r = self.rng.uniform(0, cumulative[-1])
+            index = int(np.searchsorted(cumulative, r))
+            if index < len(valid_targets):
+                return valid_targets[index]
+            return self.rng.choice(valid_targets)
 
         elif self.difficulty == "medium":
             # Define a score where lower HP and closer distance yield a lower score.
             distance_weight = 5  # tweak this multiplier to adjust the importance of distance
-
-            def score_(enemy):
-                hp = enemy.get_attribute('hp')
-                distance = manhattan_distance(
-                    att_pos, (enemy.position.x, enemy.position.y))
-                return hp + distance_weight * distance
-            return min(valid_targets, key=score_)
+            scores = field.enemy_hp[indices] + distance_weight * distances
+            return valid_targets[int(scores.argmin())]
 
         elif self.difficulty == "hard":
             # Calculate a ratio: high threat level and low distance are preferred.
-            def score(enemy):
-                threat = self._calculate_threat_level(enemy)
-                distance = manhattan_distance(
-                    att_pos, (enemy.position.x, enemy.position.y))
-                return threat / (distance + 1)  # add 1 to avoid division by zero
-            return max(valid_targets, key=score)
+            scores = field.threat[indices] / (distances + 1)  # add 1 to avoid division by zero
+            return valid_targets[int(scores.argmax())]
 
         else:
-            return random.choice(valid_targets)
+            return self.rng.choice(valid_targets)
@@ -0,0 +1,110 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Callable, Iterator, Optional
+
+
+class BattleSession:
+    """One hosted battle; hold `lock` while reading or advancing the battlefield"""
+
+    def __init__(self, battle_id: str, battlefield, now: float):
+        self.battle_id = battle_id
+        self.battlefield = battlefield
+        self.view = None  # presentation state owned by the serving layer
+        self.stream = None  # auto-play stream feeding spectators, if any
+        self.lock = threading.RLock()
+        self.created = now
+        self.last_used = now
+
+
+class BattleManager:
+    """Hosts many battles in one process, keyed by an opaque battle id.
+
+    Battles are created on demand by `factory()`, kept in least recently used
+    order and evicted when more than `max_battles` are hosted or when they
+    have been idle for longer than `idle_ttl` seconds. The manager's own lock
+    only guards the table; each battle has its own lock so that turns of
+    different battles run concurrently.
+    """
+
+    def __init__(self, factory: Callable[[], object], max_battles: int = 256, idle_ttl: float = 30 * 60,
+                 clock: Callable[[], float] = time.monotonic):
+        self.factory = factory
+        self.max_battles = max_battles
+        self.idle_ttl = idle_ttl
+        self.clock = clock
+        self._sessions: 'OrderedDict[str, BattleSession]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.on_evict: Optional[Callable[[BattleSession], None]] = None
+
+    def create(self, battle_id: Optional[str] = None) -> BattleSession:
+        """Start a new battle, replacing any battle already hosted under battle_id"""
+        battle_id = battle_id or uuid.uuid4().hex
+        # build outside the table lock, setting up a battlefield can take a while
+        battlefield = self.factory()
+        evicted = []
+        with self._lock:
+            now = self.clock()
+            replaced = self._sessions.pop(battle_id, None)
+            if replaced is not None:
+                evicted.append(replaced)
+            session = self._sessions[battle_id] = BattleSession(battle_id, battlefield, now)
+            evicted.extend(self._evict(now))
+        self._notify(evicted)
+        return session
+
+    def get(self, battle_id: Optional[str]) -> Optional[BattleSession]:
+        """The battle hosted under battle_id, None if there is none or it expired"""
+        if battle_id is None:
+            return None
+        with self._lock:
+            now = self.clock()
+            evicted = self._evict(now)
+            session = self._sessions.get(battle_id)
+            if session is not None:
+                session.last_used = now
+                self._sessions.move_to_end(battle_id)
+        self._notify(evicted)
+        return session
+
+    def get_or_create(self, battle_id: Optional[str]) -> BattleSession:
+        return self.get(battle_id) or self.create(battle_id)
+
+    def remove(self, battle_id: str):
+        with self._lock:
+            session = self._sessions.pop(battle_id, None)
+        if session is not None:
+            self._notify([session])
+
+    def evict_idle(self):
+        """Drop battles idle for longer than idle_ttl, for callers that want to sweep on a timer"""
+        with self._lock:
+            evicted = self._evict(self.clock())
+        self._notify(evicted)
+
+    def _evict(self, now: float) -> list:
+        """Pop expired and over-capacity battles, oldest first; the table lock must be held"""
+        evicted = []
+        while self._sessions:
+            battle_id, oldest = next(iter(self._sessions.items()))
+            if len(self._sessions) <= self.max_battles and now - oldest.last_used <= self.idle_ttl:
+                break
+            del self._sessions[battle_id]
+            evicted.append(oldest)
+        return evicted
+
+    def _notify(self, evicted: list):
+        if self.on_evict is not None:
+            for session in evicted:
+                self.on_evict(session)
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def __contains__(self, battle_id: str):
+        return battle_id in self._sessions
+
+    def __iter__(self) -> Iterator[BattleSession]:
+        with self._lock:
+            return iter(list(self._sessions.values()))
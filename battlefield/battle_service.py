@@ -0,0 +1,139 @@
+from roster import RosterStore
+from manual_battle import ManualBattleField
+from battle_manager import BattleManager
+from battle_view import BattleView
+from events import EventLog
+from battle_stream import BattleStream, KEEPALIVE
+import json
+import os
+
+# Battle hosting shared by the Flask (web_ui) and ASGI (asgi_app) front ends.
+# Everything here is synchronous and takes the battle lock where needed, the
+# async app runs these calls on worker threads.
+
+# sample characters of the demo battle, see characters.json
+roster = RosterStore.from_json_file(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'characters.json'))
+
+
+def new_battlefield() -> ManualBattleField:
+    """A fresh battle between the sample teams – both teams are AI for this example"""
+    teamA = roster.spawn_team("Alpha", ["Naruto Uzumaki", "Madara Uchiha"])
+    teamB = roster.spawn_team("Bravo", ["Sasuke Uchiha", "Kakashi Hatake"])
+    # kept for the clients to read through BattleView, never echoed to the server's stdout
+    return ManualBattleField(teamA, teamB, grid_size=(50, 20), events=EventLog())
+
+
+# every visitor gets their own battle, kept while they keep playing
+battles = BattleManager(new_battlefield,
+                        max_battles=int(os.environ.get('BATTLE_MAX_BATTLES', 256)),
+                        idle_ttl=float(os.environ.get('BATTLE_IDLE_TTL', 30 * 60)))
+STREAM_INTERVAL = float(os.environ.get('BATTLE_STREAM_INTERVAL', 0.5))  # seconds between streamed turns
+STREAM_MAX_TURNS = 500
+
+
+def stop_stream(battle):
+    if battle.stream is not None:
+        battle.stream.stop()
+
+
+battles.on_evict = stop_stream
+
+
+def with_view(battle):
+    with battle.lock:
+        if battle.view is None:
+            battle.view = BattleView(battle.battlefield)
+    return battle
+
+
+def advance(battle) -> int:
+    """Play one turn of a hosted battle and record it for its clients, the battle lock must be held"""
+    battle.battlefield.next_turn()
+    return battle.view.commit()
+
+
+def battle_over(battle) -> bool:
+    battlefield = battle.battlefield
+    return not battlefield.human_team.characters or not battlefield.ai_team.characters \
+        or battlefield.turn_count >= STREAM_MAX_TURNS
+
+
+def stream_for(battle) -> BattleStream:
+    """The battle's auto-play stream, started again if it ran out of spectators"""
+    with battle.lock:
+        if battle.stream is None or not battle.stream.active:
+            battle.stream = BattleStream(battle, advance, battle_over, interval=STREAM_INTERVAL)
+        return battle.stream
+
+
+def get_grid_as_html(battlefield: ManualBattleField) -> str:
+    """The grid as text, wrapped in a <pre> block."""
+    # rendered directly rather than by capturing display_grid's stdout, which
+    # would interleave between battles served on different threads
+    return f"<pre>{battlefield.render_grid()}\n</pre>"
+
+
+def index_context(battle) -> dict:
+    """Template variables of the index page.
+
+    The log is left to the /state snapshot the page loads right away, rendering
+    the commentary here would cost a whole battle's worth of text per page view.
+    """
+    with battle.lock:
+        battlefield = battle.battlefield
+        return {
+            "turn": battlefield.turn_count,
+            "grid": get_grid_as_html(battlefield),
+        }
+
+
+def snapshot(battle) -> dict:
+    with battle.lock:
+        payload = battle.view.snapshot()
+    payload["battle_id"] = battle.battle_id
+    return payload
+
+
+def request_cursor(body):
+    """The cursor of a /next_turn request body, None when the body isn't a JSON object holding one"""
+    return body.get("cursor") if isinstance(body, dict) else None
+
+
+def next_turn_delta(battle, cursor) -> dict:
+    """Play a turn and return what changed since the client's cursor"""
+    with battle.lock:
+        advance(battle)
+        return battle.view.delta(cursor)
+
+
+def session_battle(session):
+    """The battle of a (Flask or Quart) session, starting one if it has none or it was evicted"""
+    battle = battles.get_or_create(session.get('battle_id'))
+    session['battle_id'] = battle.battle_id
+    return with_view(battle)
+
+
+def find_battle(battle_id: str):
+    """A hosted battle ready to be served, None if there is no such battle"""
+    battle = battles.get(battle_id)
+    return with_view(battle) if battle is not None else None
+
+
+def replace_session_battle(session):
+    """Start a new battle for a session, dropping its old one"""
+    if session.get('battle_id'):
+        battles.remove(session['battle_id'])
+    battle = battles.create()
+    session['battle_id'] = battle.battle_id
+    return battle
+
+
+SSE_HEADERS = {'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+SSE_END = "event: end\ndata: {}\n\n"
+
+
+def sse_message(payload) -> str:
+    """One Server-Sent Events message for a stream payload (or a keepalive comment)"""
+    if payload is KEEPALIVE:
+        return ": keepalive\n\n"
+    return f"data: {json.dumps(payload)}\n\n"
@@ -0,0 +1,238 @@
+import asyncio
+import threading
+from collections import deque
+from typing import Callable, Deque, Iterator, List, Optional
+
+KEEPALIVE = object()  # yielded by Subscriber when nothing happened for a while
+RESYNC = object()  # queued marker: send a snapshot next
+WAIT = object()  # nothing queued yet
+
+
+class Subscriber:
+    """One spectator's queue of pending turn payloads.
+
+    The queue is bounded: a spectator that falls more than `max_pending`
+    payloads behind has its backlog dropped and is sent a fresh snapshot
+    instead, so slow clients never hold up the battle or grow memory.
+    """
+
+    def __init__(self, stream: 'BattleStream', max_pending: int):
+        self.stream = stream
+        self.max_pending = max_pending
+        self.cursor: Optional[int] = None
+        self.dropped = 0  # backlogs thrown away for being too slow
+        self._pending: Deque[dict] = deque()
+        self._resync = True  # the first payload is always a snapshot
+        self._finished = False
+        self._closed = False
+        self._ready = threading.Condition()
+
+    def push(self, payload: dict):
+        with self._ready:
+            if self._closed:
+                return
+            if len(self._pending) >= self.max_pending:
+                self._pending.clear()
+                self._resync = True
+                self.dropped += 1
+            else:
+                self._pending.append(payload)
+            self._signal()
+
+    def finish(self):
+        """No more turns are coming, end the iteration once the backlog is sent"""
+        with self._ready:
+            self._finished = True
+            self._signal()
+
+    def close(self):
+        with self._ready:
+            self._closed = True
+            self._pending.clear()
+            self._signal()
+        self.stream.unsubscribe(self)
+
+    def _signal(self):
+        """Wake up the reader, called with the condition held"""
+        self._ready.notify()
+
+    def _has_news(self) -> bool:
+        return bool(self._pending) or self._resync or self._finished or self._closed
+
+    def _take(self):
+        """Pop the next item: RESYNC, a payload, None at the end, or WAIT when there is nothing yet"""
+        with self._ready:
+            if self._closed:
+                return None
+            if self._resync:
+                self._resync = False
+                self._pending.clear()
+                return RESYNC
+            if self._pending:
+                return self._pending.popleft()
+            if self._finished:
+                return None
+            return WAIT
+
+    def _accept(self, payload: dict) -> bool:
+        """Check a delta applies on top of what was sent so far, flagging a resync when it doesn't"""
+        if payload.get('since') == self.cursor:
+            self.cursor = payload['cursor']
+            return True
+        if self.cursor is None or payload['cursor'] > self.cursor:
+            # the battle moved on without us (a turn was played outside the stream), start over
+            with self._ready:
+                self._resync = True
+        # otherwise it is already covered by the snapshot we sent
+        return False
+
+    def next(self, timeout: Optional[float] = None):
+        """The next payload, KEEPALIVE after timeout seconds without one, None at the end"""
+        while True:
+            with self._ready:
+                if not self._ready.wait_for(self._has_news, timeout):
+                    return KEEPALIVE
+            item = self._take()
+            if item is RESYNC:
+                # taken outside our lock, the stream takes the battle lock for it
+                payload = self.stream.snapshot()
+                self.cursor = payload['cursor']
+                return payload
+            if item is WAIT:
+                continue
+            if item is None or self._accept(item):
+                return item
+
+    def __iter__(self) -> Iterator:
+        return self
+
+    def __next__(self):
+        payload = self.next(self.stream.keepalive)
+        if payload is None:
+            raise StopIteration
+        return payload
+
+
+class AsyncSubscriber(Subscriber):
+    """Subscriber read from an asyncio event loop, so idle spectators cost no thread.
+
+    The stream thread still pushes into it; wake-ups are handed to the loop
+    thread-safely and snapshots are taken on the loop's default executor.
+    """
+
+    def __init__(self, stream: 'BattleStream', max_pending: int, loop: asyncio.AbstractEventLoop):
+        self._loop = loop
+        self._wakeup = asyncio.Event()
+        super().__init__(stream, max_pending)
+
+    def _signal(self):
+        self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    async def next_async(self, timeout: Optional[float] = None):
+        """The next payload, KEEPALIVE after timeout seconds without one, None at the end"""
+        while True:
+            item = self._take()
+            if item is WAIT:
+                self._wakeup.clear()
+                # anything pushed after the clear sets the event again
+                item = self._take()
+            if item is WAIT:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout)
+                except asyncio.TimeoutError:
+                    return KEEPALIVE
+                continue
+            if item is RESYNC:
+                payload = await self._loop.run_in_executor(None, self.stream.snapshot)
+                self.cursor = payload['cursor']
+                return payload
+            if item is None or self._accept(item):
+                return item
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        payload = await self.next_async(self.stream.keepalive)
+        if payload is None:
+            raise StopAsyncIteration
+        return payload
+
+
+class BattleStream:
+    """Plays a hosted battle turn by turn on a background thread and fans each turn out to spectators.
+
+    `step(battle)` plays one turn and `is_over(battle)` tells when to stop;
+    both are called with the battle lock held. Turns are played every
+    `interval` seconds while at least one spectator is subscribed.
+    """
+
+    def __init__(self, battle, step: Callable, is_over: Callable, interval: float = 0.5,
+                 max_pending: int = 32, keepalive: float = 15.0):
+        self.battle = battle
+        self.step = step
+        self.is_over = is_over
+        self.interval = interval
+        self.max_pending = max_pending
+        self.keepalive = keepalive
+        self._subscribers: List[Subscriber] = []
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def active(self) -> bool:
+        """False once the stream has stopped playing, new spectators then need a new stream"""
+        return not self._stopped.is_set()
+
+    def subscribe(self, loop: Optional[asyncio.AbstractEventLoop] = None) -> Subscriber:
+        """A new spectator; pass the running event loop to get an AsyncSubscriber"""
+        if loop is not None:
+            subscriber = AsyncSubscriber(self, self.max_pending, loop)
+        else:
+            subscriber = Subscriber(self, self.max_pending)
+        with self._lock:
+            self._subscribers.append(subscriber)
+            if self._stopped.is_set():
+                # too late to join, the spectator still gets the final snapshot
+                subscriber.finish()
+            elif self._thread is None:
+                self._thread = threading.Thread(target=self._run, name=f'battle-{self.battle.battle_id}',
+                                                daemon=True)
+                self._thread.start()
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber):
+        with self._lock:
+            if subscriber in self._subscribers:
+                self._subscribers.remove(subscriber)
+
+    def snapshot(self) -> dict:
+        with self.battle.lock:
+            return self.battle.view.snapshot()
+
+    def stop(self):
+        self._stopped.set()
+
+    def _run(self):
+        try:
+            while not self._stopped.wait(self.interval):
+                with self._lock:
+                    if not self._subscribers:
+                        break
+                with self.battle.lock:
+                    if self.is_over(self.battle):
+                        break
+                    before = self.battle.view.revision
+                    self.step(self.battle)
+                    payload = self.battle.view.delta(before)
+                with self._lock:
+                    subscribers = list(self._subscribers)
+                for subscriber in subscribers:
+                    subscriber.push(payload)
+        finally:
+            self._stopped.set()
+            with self._lock:
+                subscribers = list(self._subscribers)
+            for subscriber in subscribers:
+                subscriber.finish()
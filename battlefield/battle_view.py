@@ -0,0 +1,90 @@
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+from events import render
+
+SNAPSHOT_LOG_LINES = 200  # log lines sent with a full snapshot, older ones are only in the battle log
+
+UnitState = Tuple[Optional[int], Optional[int], float, bool]  # x, y, hp, alive
+
+
+class BattleView:
+    """Client-facing view of a grid battle: full snapshots and deltas between revisions.
+
+    Call commit() after every turn. Each commit is a new revision; clients keep
+    the revision they last rendered as their cursor and ask for delta(cursor),
+    which only holds the units that changed and the events logged since. The
+    unit states of the last `history` revisions are kept to diff against, a
+    client further behind (or reconnecting) gets a snapshot instead.
+    """
+
+    def __init__(self, battlefield, history: int = 32):
+        self.battlefield = battlefield
+        self.history = history
+        self.units = list(battlefield.human_team.characters) + list(battlefield.ai_team.characters)
+        self._teams = [character.team.name for character in self.units]
+        self.revision = 0
+        self._revisions: 'OrderedDict[int, Tuple[List[UnitState], int]]' = OrderedDict()
+        self._record()
+
+    def _unit_states(self) -> List[UnitState]:
+        states = []
+        for character in self.units:
+            position = character.position
+            x, y = (position.x, position.y) if position is not None else (None, None)
+            states.append((x, y, character.get_attribute('hp'), character.team is not None))
+        return states
+
+    def _record(self):
+        self._revisions[self.revision] = (self._unit_states(), self.battlefield.events.last_sequence)
+        while len(self._revisions) > self.history:
+            self._revisions.popitem(last=False)
+
+    def commit(self) -> int:
+        """Record the state after a turn as a new revision"""
+        self.revision += 1
+        self._record()
+        return self.revision
+
+    def _unit_json(self, unit_id: int, state: UnitState) -> dict:
+        x, y, hp, alive = state
+        return {"id": unit_id, "x": x, "y": y, "hp": hp, "alive": alive}
+
+    def snapshot(self) -> dict:
+        """Everything a client needs to render the battle from scratch"""
+        states, _ = self._revisions[self.revision]
+        units = []
+        for unit_id, (character, state) in enumerate(zip(self.units, states)):
+            unit = self._unit_json(unit_id, state)
+            unit["name"] = character.name
+            unit["team"] = self._teams[unit_id]
+            units.append(unit)
+        log = list(self.battlefield.events)[-SNAPSHOT_LOG_LINES:]
+        return {
+            "type": "snapshot",
+            "cursor": self.revision,
+            "turn": self.battlefield.turn_count,
+            "width": self.battlefield.width,
+            "height": self.battlefield.height,
+            "teams": [self.battlefield.human_team.name, self.battlefield.ai_team.name],
+            "units": units,
+            "events": [render(event) for event in log],
+        }
+
+    def delta(self, cursor: Optional[int]) -> dict:
+        """What changed since revision cursor, or a snapshot when that revision is no longer kept"""
+        base = self._revisions.get(cursor) if cursor is not None else None
+        if base is None:
+            return self.snapshot()
+        old_states, old_sequence = base
+        states, _ = self._revisions[self.revision]
+        changed = [self._unit_json(unit_id, state)
+                   for unit_id, (old, state) in enumerate(zip(old_states, states)) if old != state]
+        return {
+            "type": "delta",
+            "since": cursor,
+            "cursor": self.revision,
+            "turn": self.battlefield.turn_count,
+            "units": changed,
+            "events": [render(event) for event in self.battlefield.events.since(old_sequence)],
+        }
@@ -1,4 +1,18 @@
-from typing import List
+from typing import List, Optional, Tuple
+
+from abilities import compile_ability
+
+
+# (upper bound, bracket) pairs, a rank above every bound is 'S'
+RANK_BRACKETS = ((4000, 'E'), (6000, 'D'), (8000, 'C'), (10000, 'B'), (14000, 'A'))
+
+
+def rank_bracket(rank) -> str:
+    """Battle rank letter of a character rank"""
+    for bound, bracket in RANK_BRACKETS:
+        if rank <= bound:
+            return bracket
+    return 'S'
 
 
 class Attribute(object):
@@ -16,6 +30,26 @@ class Attribute(object):
         return self.name == other.name
     
 
+class AttributeView(Attribute):
+    """One attribute of a Character, reading and writing the character's live value"""
+
+    def __init__(self, character, slot):
+        self.character = character
+        self.slot = slot
+
+    @property
+    def name(self):
+        return self.character._attribute_names[self.slot]
+
+    @property
+    def value(self):
+        return self.character._values[self.slot]
+
+    @value.setter
+    def value(self, value):
+        self.character._change_slot(self.slot, value - self.character._values[self.slot])
+
+
 class Position:
     def __init__(self, x: int = 0, y: int = 0):
         self.x = x
@@ -51,35 +85,48 @@ class Position:
         return NotImplemented
     
 
+ABILITY_DESCRIPTIONS = {
+    "evasion": 'Evade attacks to certain extent',
+    'critical strike': 'Chance to deal certain multiple of damage',
+    'poison': 'Deal damage over time',
+    'stun': 'Stun the enemy for a turn',
+    'heal self': 'Heal self',
+    'heal others': 'Heal others',
+    'buff': 'Increase hp to certain extent'
+}
+# attributes whose changes during a battle move a character's rank and its team's rating;
+# spending mp or stamina is part of fighting, not a loss of strength
+RATED_ATTRIBUTES = ('hp', 'armor')
+# turns a status effect ability lasts
+STATUS_DURATIONS = {'poison': 3, 'stun': 1, 'evasion': 1}
+
+
 class SpecialAbility:
+    """An ability definition; never changed during a battle, so every copy of a character shares it"""
+
     def __init__(self, name, value, mp_cost, jutsu_name):
         self.name = name
         self.jutsu_name = jutsu_name
         self.value = value
         self.mp_cost = mp_cost
-        self.is_status_effect = False
-        self.duration = 0
-        if name in ['evasion', 'poison', 'stun',]:
-            self.is_status_effect = True
-        if name == 'poison':
-            self.duration = 3
-        elif name == 'stun':
-            self.duration = 1
-        elif name == 'evasion':
-            self.duration = 1
+        self.is_status_effect = name in STATUS_DURATIONS
+        self.duration = STATUS_DURATIONS.get(name, 0)
         self.description = self.get_description(name)
+        self.effect = compile_ability(self)  # what casting it does, see abilities.py
 
     def get_description(self, name):
-        ability_dict = {
-            "evasion": 'Evade attacks to certain extent',
-            'critical strike': 'Chance to deal certain multiple of damage',
-            'poison': 'Deal damage over time',
-            'stun': 'Stun the enemy for a turn',
-            'heal self': 'Heal self',
-            'heal others': 'Heal others',
-            'buff': 'Increase hp to certain extent'
+        return ABILITY_DESCRIPTIONS.get(name)
+
+    def to_json(self):
+        return {
+            'name': self.name,
+            'jutsu_name': self.jutsu_name,
+            'value': self.value,
+            'mp_cost': self.mp_cost,
+            'is_status_effect': self.is_status_effect,
+            'duration': self.duration,
+            'description': self.description,
         }
-        return ability_dict.get(name)
 
     def __str__(self):
         return self.name
@@ -91,43 +138,88 @@ class SpecialAbility:
         return self.name == other.name
 
 
+def _no_status_effects() -> dict:
+    return {
+        "poison": 0,
+        "stun": 0,
+        "buff": 0,
+        "evasion": 0,
+    } #status effects are per-turn effects
+
+
 class Character(object):
+    """A character as it fights: mutable combat state on top of its base definition.
+
+    Attribute values live in one flat list (`_values`, in `_attribute_names`
+    order); `_slots` maps a name to its first slot. CharacterTemplate.spawn
+    builds characters by copying that list instead of going through __init__.
+    """
+
     def __init__(self, name, attributes: List[Attribute], character_class):
         self.name = name
         self.character_class = character_class
         self.attributes = attributes
         self.special_abilities = []
         self.rank = 0
+        self.team = None  # set by Team.assemble, kept up to date with rank changes
+        self.grid = None  # OccupancyGrid tracking this character, set by OccupancyGrid.place
         self.position = Position(0, 0)
         self.controller = ''
-        self.status_effects = {
-            "poison": 0,
-            "stun": 0,
-            "buff": 0,
-            "evasion": 0,
-        } #status effects are per-turn effects
+        self.status_effects = _no_status_effects()
         for attribute in attributes:
             self.rank += attribute.value
             setattr(self, attribute.name, attribute.value)
 
+    @property
+    def attributes(self) -> Tuple[AttributeView, ...]:
+        """Current attributes; setting a value goes through modify_attribute, the set of attributes is fixed.
+
+        The views are built on first access and the same tuple is returned from then on.
+        """
+        if self._attribute_views is None:
+            self._attribute_views = tuple(AttributeView(self, slot) for slot in range(len(self._values)))
+        return self._attribute_views
+
+    @attributes.setter
+    def attributes(self, attributes: List[Attribute]):
+        self._attribute_names = tuple(attribute.name for attribute in attributes)
+        self._values = [attribute.value for attribute in attributes]
+        self._base_values = tuple(self._values)
+        self._attribute_views = None
+        self._slots = _attribute_slots(self._attribute_names)
+
+    @property
+    def position(self) -> Optional[Position]:
+        return self._position
+
+    @position.setter
+    def position(self, position: Optional[Position]):
+        if self.grid is not None:
+            self.grid.move(self, position)
+        self._position = position
+        if self.team is not None:
+            self.team._on_move(self)
+
     def _add_special_ability(self, special_ability: SpecialAbility):
         self.rank += special_ability.value
+        if self.team is not None:
+            self.team._on_rank_change(self, special_ability.value)
         self.special_abilities.append(special_ability)
 
     def to_json(self):
         return {
             'name': self.name,
             'class': self.character_class,
-            'attributes': [attribute.__dict__ for attribute in self.attributes],
-            'special_abilities': [special_ability.__dict__ for special_ability in self.special_abilities]
+            'attributes': [{'name': name, 'value': value} for name, value in zip(self._attribute_names, self._values)],
+            'special_abilities': [special_ability.to_json() for special_ability in self.special_abilities]
         }
 
     def describe(self):
         print(f'Name: {self.name}')
         print(f'Class: {self.character_class}')
         print('Attributes:')
-        for attribute in self.attributes:
-            print(f'{attribute.name}: {attribute.value}')
+        for name, value in zip(self._attribute_names, self._values):
+            print(f'{name}: {value}')
         print('Special Abilities:')
         for special_ability in self.special_abilities:
             print(
@@ -135,19 +227,37 @@ class Character(object):
 
     def modify_attribute(self, attr_name: str, value: int):
         try:
-            attribute = next(
-                attr for attr in self.attributes if attr.name == attr_name)
-            attribute.value += value
-            setattr(self, attribute.name, attribute.value)
-        except StopIteration:
+            slot = self._slots[attr_name]
+        except KeyError:
             raise ValueError(f'No attribute with name {attr_name} found')
+        self._change_slot(slot, value)
+
+    def _change_slot(self, slot: int, value):
+        attr_name = self._attribute_names[slot]
+        self._values[slot] += value
+        setattr(self, attr_name, self._values[slot])
+        # rank starts as the sum of all attribute and ability values, hp and armor keep it (and the team rating) live
+        if attr_name in RATED_ATTRIBUTES:
+            self.rank += value
+        if self.team is not None:
+            self.team._on_attribute_change(self, attr_name, value)
 
     def get_attribute(self, attr_name: str):
         try:
-            return next(attr.value for attr in self.attributes if attr.name == attr_name)
-        except StopIteration:
+            return self._values[self._slots[attr_name]]
+        except KeyError:
             raise ValueError(f'No attribute with name {attr_name} found')
-        
+
+    def base_attribute(self, attr_name: str):
+        """The value an attribute started with, e.g. the full hp to measure wounds against"""
+        try:
+            return self._base_values[self._slots[attr_name]]
+        except KeyError:
+            raise ValueError(f'No attribute with name {attr_name} found')
+
+    def has_attribute(self, attr_name: str) -> bool:
+        return attr_name in self._slots
+
     def get_special_ability(self, ability_name: str)->SpecialAbility:
         try:
             return next(ability for ability in self.special_abilities if ability.name == ability_name)
@@ -166,31 +276,10 @@ class Character(object):
 
     @classmethod
     def from_json(cls, data):
-        name = data['name']
-        character_class = data['class']
-        attributes = [Attribute(attribute['name'], attribute['value'])
-                      for attribute in data['attributes']]
-        character = cls(name, attributes, character_class)
-        for special_ability in data['special_abilities']:
-            character._add_special_ability(SpecialAbility(
-                special_ability['name'], special_ability['value'], 
-                special_ability['mp_cost'], special_ability['jutsu_name']))
-        character.position = None
-        return character
+        return CharacterTemplate.from_json(data).spawn(cls)
 
     def battle_rank(self):
-        if self.rank <= 4000:
-            return 'E'
-        elif self.rank > 4000 and self.rank <= 6000:
-            return 'D'
-        elif self.rank > 6000 and self.rank <= 8000:
-            return 'C'
-        elif self.rank > 8000 and self.rank <= 10000:
-            return 'B'
-        elif self.rank > 10000 and self.rank <= 14000:
-            return 'A'
-        else:
-            return 'S'
+        return rank_bracket(self.rank)
 
     def __str__(self):
         return self.name
@@ -200,3 +289,96 @@ class Character(object):
 
     def __eq__(self, other):
         return self.name == other.name
+
+
+def _attribute_slots(names) -> dict:
+    slots = {}
+    for slot, name in enumerate(names):
+        # the first attribute with a name wins, like the old linear scan
+        slots.setdefault(name, slot)
+    return slots
+
+
+class CharacterTemplate:
+    """Immutable base definition of a character: name, class, base attributes and abilities.
+
+    spawn() hands out battle-ready Characters. Everything shared between the
+    copies is prepared once, here, so a spawn is a couple of flat copies
+    instead of a from_json parse; rebuilding teams between simulations is
+    then cheap.
+    """
+
+    __slots__ = ('name', 'character_class', 'attribute_names', 'values', 'special_abilities', 'rank', '_fields')
+
+    def __init__(self, name, character_class, attributes, special_abilities=()):
+        """attributes are (name, value) pairs, special_abilities SpecialAbility objects"""
+        attributes = tuple((attribute_name, value) for attribute_name, value in attributes)
+        special_abilities = tuple(special_abilities)
+        values = tuple(value for _, value in attributes)
+        rank = sum(values) + sum(ability.value for ability in special_abilities)
+        fields = {
+            'name': name,
+            'character_class': character_class,
+            '_attribute_names': tuple(attribute_name for attribute_name, _ in attributes),
+            '_slots': _attribute_slots(attribute_name for attribute_name, _ in attributes),
+            '_base_values': values,
+            '_attribute_views': None,
+            'rank': rank,
+            'team': None,
+            'grid': None,
+            '_position': None,
+            'controller': '',
+        }
+        # same per-attribute fields as Character.__init__ (e.g. character.range), the last one of a name wins
+        fields.update(attributes)
+        object.__setattr__(self, 'name', name)
+        object.__setattr__(self, 'character_class', character_class)
+        object.__setattr__(self, 'attribute_names', fields['_attribute_names'])
+        object.__setattr__(self, 'values', values)
+        object.__setattr__(self, 'special_abilities', special_abilities)
+        object.__setattr__(self, 'rank', rank)
+        object.__setattr__(self, '_fields', fields)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f'{type(self).__name__} is immutable')
+
+    @classmethod
+    def from_json(cls, data) -> 'CharacterTemplate':
+        return cls(data['name'], data['class'],
+                   ((attribute['name'], attribute['value']) for attribute in data['attributes']),
+                   (SpecialAbility(special_ability['name'], special_ability['value'],
+                                   special_ability['mp_cost'], special_ability['jutsu_name'])
+                    for special_ability in data['special_abilities']))
+
+    def spawn(self, cls=Character) -> Character:
+        """A fresh Character (or instance of a Character subclass) at full base stats, not placed and in no team.
+
+        A subclass overriding __init__ is built through it (with Character's
+        arguments), so whatever state it sets up is there; plain Characters
+        skip __init__ and copy the prepared fields instead.
+        """
+        if cls.__init__ is not Character.__init__:
+            character = cls(self.name, [Attribute(name, value) for name, value in zip(self.attribute_names, self.values)],
+                            self.character_class)
+            for special_ability in self.special_abilities:
+                character._add_special_ability(special_ability)
+            character.position = None  # not placed, like every spawn
+            return character
+        character = cls.__new__(cls)
+        character.__dict__.update(self._fields)
+        # _slots is never modified after creation, so it is shared as well
+        character._values = list(self.values)
+        character.special_abilities = list(self.special_abilities)
+        character.status_effects = _no_status_effects()
+        return character
+
+    def to_json(self):
+        return {
+            'name': self.name,
+            'class': self.character_class,
+            'attributes': [{'name': name, 'value': value} for name, value in zip(self.attribute_names, self.values)],
+            'special_abilities': [special_ability.to_json() for special_ability in self.special_abilities]
+        }
+
+    def __repr__(self):
+        return f'CharacterTemplate({self.name!r})'
@@ -1,49 +1,47 @@
-import random, time
+import time
+from typing import Callable, Optional
 
 from teams import Team 
-from characters import Character, Attribute
+from characters import Character, Attribute, SpecialAbility
 from handlers import SpecialAbilityHandler
+from rng import BattleRNG
+from status_effects import StatusEffect, StatusEffectRegistry
+from events import EventLog, NullEventLog
 
 
-class StatusEffect:
-    def __init__(self, name:str, value:int, duration:int, effect_receiver:Character):
-        self.name = name
-        self.value = value
-        self.duration = duration
-        self.is_active = False
-        self.effect_receiver = effect_receiver
-        self.special_ability_handler = SpecialAbilityHandler(self)
-
-    def activate(self):
-        self.is_active = True
-
-    def deactivate(self):
-        self.is_active = False
-
-    def use(self):
-        if self.is_active:
-            self.duration -= 1
-        if self.duration == 0:
-            self.deactivate()
-
 class AutoBattleField:
-    def __init__(self, team1:Team, team2:Team, moves_per_turn:int=3):
-        """This battlefield only allows two players"""
+    def __init__(self, team1:Team, team2:Team, moves_per_turn:int=3, verbose:bool=True, seed:Optional[int]=None,
+                 events:Optional[EventLog]=None):
+        """This battlefield only allows two players.
+        Moves are recorded as structured events in `events`; by default they are echoed to the
+        console, with verbose=False the battle runs headless and nothing is recorded or formatted.
+        All randomness comes from self.rng, so the same seed replays the same battle."""
         self.team1 =  team1
         self.team2 = team2 
         self._turn_state_marker = team1
         self.moves_per_turn = moves_per_turn
         self.turn_count = 1
-        self.commentary = []
         self.special_ability_handler = SpecialAbilityHandler(self)
-        self.status_effects = []
+        self.status_effects = StatusEffectRegistry()
+        if events is None:
+            events = EventLog(echo=True) if verbose else NullEventLog()
+        self.events = events
+        self.rng = BattleRNG(seed)
+        self.seed = self.rng.initial_seed
 
     
+    def emit(self, kind:str, actor:Optional[str]=None, target:Optional[str]=None, *values):
+        """Record a structured event, it is only rendered to text when someone reads it"""
+        self.events.emit(self.turn_count, kind, actor, target, values)
+
     def log(self, message:str, dest:str='console'):
-        """Log a message to the commentary"""
-        self.commentary.append(message)
-        if dest == 'console':
-            print(message)
+        """Log a free text message to the commentary"""
+        self.emit('message', None, None, message)
+
+    @property
+    def commentary(self):
+        """The battle's event log rendered as text"""
+        return self.events.render()
 
 
     def get_player(self, team:Team, name:str):
@@ -64,9 +62,9 @@ class AutoBattleField:
         else:
             self._turn_state_marker = self.team1
         self.turn_count += 1
-        self._check_apply_active_poison_effects()
+        self.resolve_status_effects()
         # time.sleep(0.1)
-        self.log(f'Turn {self.turn_count}', dest='console')
+        self.emit('turn', None, None, self.turn_count)
     
     def active_team(self):
         """Get the active team"""
@@ -79,7 +77,7 @@ class AutoBattleField:
     def attack(self, attacker:Character, target:Character):
         #calculate the damage
         if self._check_active_stun_effect(attacker):
-            self.log(f'{attacker.name} is stunned and cannot attack', dest='console')
+            self.emit('stunned', attacker.name)
             return 0, 0
         damage = attacker.get_attribute('dmg')
         target_armor = target.get_attribute('armor')
@@ -127,15 +125,16 @@ class AutoBattleField:
         # Player attacks opponent
         # if turn number is a multiple of 3 use special ability instead of a normal attack
         if self.turn_count % 3 == 0:
-            ability = random.choice(player.special_abilities)
+            ability = self.rng.choice(player.special_abilities)
             self.special_ability_handler.execute(ability, player, opponent)
              
         else:
             dmg, armor =self.attack(player, opponent)
-            comment = f'{player.name} attacks {opponent.name}, dealing {dmg} damage, {opponent.name} has {opponent.get_attribute("hp"):.0f} hp  ,{opponent.get_attribute("armor"):.0f} armor left'
             if dmg == 0:
-                comment = f'{player.name} attacks {opponent.name}, but {opponent.name} dodges the attack'
-            self.log(comment, dest='console')
+                self.emit('dodge', player.name, opponent.name)
+            else:
+                self.emit('attack', player.name, opponent.name, dmg,
+                          opponent.get_attribute('hp'), opponent.get_attribute('armor'))
         self.check_player_status(opponent)
 
 
@@ -144,79 +143,74 @@ class AutoBattleField:
         active_team = self.active_team()
         opponent_team = self.team1 if active_team is self.team2 else self.team2
 
-        # Evaluate each opponent and score them (here, lower HP means more vulnerable)
-        def vulnerability(player: Character):
-            return -(player.get_attribute('hp') + player.get_attribute('armor') * 0.5)
-
-        # Get the opponents from the team and pick the one with the highest vulnerability score
-        opponents = opponent_team.characters
-        target = max(opponents, key=vulnerability)
-        return target
+        # Each team keeps its members in a heap keyed by vulnerability
+        # (lower hp + 0.5 * armor is more vulnerable), so this is a peek
+        return opponent_team.most_vulnerable()
     
     def check_player_status(self, player:Character):
         """Check if the player is still alive"""
         if player.get_attribute('hp') <= 0:
-            self.log(f'{player.name} has been killed', dest='console')
-            if player in self.team1.characters:
-                self.team1.characters.remove(player)
-            elif player in self.team2.characters:
-                self.team2.characters.remove(player)
+            self.emit('killed', player.name)
+            if player.team is not None:
+                player.team.remove(player)
 
     def check_team_status(self, team:Team):
         """Check if the team has been defeated, returns true if team has been defeated"""
         if len(team.characters) == 0:
-            self.log(f'{team.name} has been defeated', dest='console')
+            self.emit('defeated', team.name)
             return True
         return False
     
-    def apply_status_effect(self, character:Character, effect:str, target:Character):
-        """There are certain special abilities that can apply status effects, their effects are felt over a number of turns as specified in the duration attribute"""
-        ability = character.get_special_ability(effect)
+    def apply_status_effect(self, character:Character, effect:str, target:Character, ability:Optional[SpecialAbility]=None):
+        """There are certain special abilities that can apply status effects, their effects are felt over a number of turns as specified in the duration attribute.
+        `ability` is the ability being cast, by default the caster's first ability called `effect`"""
+        if ability is None:
+            ability = character.get_special_ability(effect)
         status_effect = StatusEffect(effect, ability.value, ability.duration, target)
         status_effect.activate()
-        self.status_effects.append(status_effect)
-        self.log(f'{character.name} has activated {effect} for {ability.duration} turns', dest='console')
-
-    def process_status_effects(self):
-        expired_effects = []
-        for effect in self.status_effects:
-            if effect.name == 'poison':
-                pass
-            # Decrease duration
-            effect.duration -= 1
-            if effect.duration <= 0:
-                expired_effects.append(effect)
-        for effect in expired_effects:
-            self.status_effects.remove(effect)
-            self.log(
-                f"{effect.effect_receiver.name}'s {effect.name} effect has worn off.", dest='console')
+        self.status_effects.add(status_effect, self.turn_count)
+        self.emit('effect_applied', character.name, target.name, effect, ability.duration)
+
+    def resolve_status_effects(self):
+        """End of turn effect phase, run once per turn for every active effect at once.
+
+        Effects that ran out before the current turn (stun, evasion) are
+        dropped in bulk, then every poison ticks: its damage is summed per
+        receiver and applied with one hp change each, and poisons that did
+        all their ticks are removed together. The per-effect debug events are
+        only built when the event log keeps them.
+        """
+        expired = self.status_effects.expire(self.turn_count)
+        poisons, _ = self.status_effects.tick('poison')
+        damage = {}  # id(receiver) -> [receiver, summed poison damage]
+        for effect in poisons:
+            entry = damage.get(id(effect.effect_receiver))
+            if entry is None:
+                damage[id(effect.effect_receiver)] = [effect.effect_receiver, effect.value]
+            else:
+                entry[1] += effect.value
+        for receiver, total in damage.values():
+            receiver.modify_attribute('hp', -total)
+        if self.events.enabled('poison_tick'):
+            self._emit_status_effect_events(expired, poisons)
+
+    def _emit_status_effect_events(self, expired, poisons):
+        for effect in expired:
+            self.emit('effect_expired', effect.effect_receiver.name, None, effect.name)
+        for effect in poisons:
+            self.emit('poison_tick', effect.effect_receiver.name, None, effect.value)
+            if effect.duration == 0:
+                self.emit('poison_cured', effect.effect_receiver.name)
+            else:
+                self.emit('poison_left', effect.effect_receiver.name, None, effect.duration)
 
     def _check_active_evasion_skill(self, player:Character):
         """Check if the player has an active evasion skill"""
-        for effect in self.status_effects:
-            if effect.name == 'evasion' and effect.effect_receiver == player:
-                return True
-        return False
+        return self.status_effects.has(player, 'evasion')
     
     def _check_active_stun_effect(self, player:Character):
         """Check if the player has an active stun effect"""
-        for effect in self.status_effects:
-            if effect.name == 'stun' and effect.effect_receiver == player:
-                return True
-        return False
-    
-    def _check_apply_active_poison_effects(self):
-        """Check for all poisoned players and apply poison effect"""
-        for effect in self.status_effects:
-            if effect.name == 'poison':
-                effect.effect_receiver.modify_attribute('hp', -effect.value)
-                self.log(f'{effect.effect_receiver.name}  -{effect.value} hp', dest='console')
-                effect.duration -= 1
-                if effect.duration == 0:
-                    self.status_effects.remove(effect)
-                    self.log(f'{effect.effect_receiver.name} has been cured of poison', dest='console')
-                else:
-                    self.log(f'{effect.effect_receiver.name} has been poisoned for {effect.duration} turns', dest='console')
+        return self.status_effects.has(player, 'stun')
     
     def execute_turn(self):
         """Execute a single turn for the active team with a maximum number of moves"""
@@ -225,31 +219,31 @@ class AutoBattleField:
 
         # If the opponent team is already defeated, return immediately.
         if not opponent_team.characters:
-            self.log(
-            f"No opponents remain for {active_team.name}.", dest='console')
+            self.emit('no_opponents', active_team.name)
             return
 
         for _ in range(self.moves_per_turn):
             # Check both teams before each move
             if active_team.characters and opponent_team.characters:
-                player = random.choice(active_team.characters)
+                player = self.rng.choice(active_team.characters)
                 self.initiate_player_action(player)
             else:
                 break
 
         self.next_turn()
 
-    def run_battle(self, max_turns:int=200)->Team:
-        """Run the battle simulation until one team is defeated."""
-        self.log("Battle started!", dest='console')
-        self.log(f"{self.team1.name} {self.team1.compute_rating()} vs. {self.team2.name} {self.team2.compute_rating()}", dest='console')
-        self.log(f"Team {self.team1.name} members: {[player.name for player in self.team1.characters]}", dest='console')
-        self.log(f"Team {self.team2.name} members: {[player.name for player in self.team2.characters]}", dest='console')
+    def run_battle(self, max_turns:int=200, on_turn:Optional[Callable[['AutoBattleField'], None]]=None)->Team:
+        """Run the battle simulation until one team is defeated.
+        on_turn, if given, is called with the battlefield after every turn (e.g. to record a replay)."""
+        self.emit('battle_start')
+        self.emit('ratings', self.team1.name, self.team2.name, self.team1.rating, self.team2.rating)
+        for team in (self.team1, self.team2):
+            self.emit('members', team.name, None, [player.name for player in team.characters])
         while True:
             # Execute a turn for the active team
             self.execute_turn()
-            self.team1.compute_rating()
-            self.team2.compute_rating()
+            if on_turn is not None:
+                on_turn(self)
             # Check if either team is defeated
             if self.check_team_status(self.team1):
                 winner = self.team2
@@ -259,14 +253,13 @@ class AutoBattleField:
                 break
             # Check if the maximum number of turns has been reached
             if self.turn_count >= max_turns:
-                self.log("Maximum number of turns reached.", dest='console')
-                # evaluate winner by team rating
+                self.emit('max_turns')
+                # evaluate winner by team rating, maintained live as attributes change
                 if self.team1.rating > self.team2.rating:
                     winner = self.team1
                 else:
                     winner = self.team2
                 break
-        self.log("Battle simulation finished.", dest='console')
-        self.log(f"The winner is {winner.name}, team ratings: {self.team1} :: {self.team1.rating}\
-                {self.team2} :: {self.team2.rating} ", dest='console')
+        self.emit('battle_end')
+        self.emit('winner', winner.name, None, self.team1.name, self.team1.rating, self.team2.name, self.team2.rating)
         return winner
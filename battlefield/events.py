@@ -0,0 +1,134 @@
+from collections import deque
+from typing import Any, Deque, Iterator, List, NamedTuple, Optional, Tuple
+
+# verbosity levels, an event is kept when its level is <= the log level
+SILENT = 0
+SUMMARY = 1  # battle start/end, kills, defeats
+DETAIL = 2  # every attack, ability and move
+DEBUG = 3  # status effect bookkeeping, turn markers, AI chatter
+
+DEFAULT_CAPACITY = 10000  # events kept per battle before the oldest are dropped
+
+# event kind -> (level, template); templates are str.format strings over
+# {actor}, {target} and the event's positional values
+EVENT_TYPES = {
+    'message': (DETAIL, '{0}'),
+    'battle_start': (SUMMARY, 'Battle started!'),
+    'ratings': (SUMMARY, '{actor} {0} vs. {target} {1}'),
+    'members': (SUMMARY, 'Team {actor} members: {0}'),
+    'turn': (DEBUG, 'Turn {0}'),
+    'turn_completed': (DETAIL, 'Turn {0} completed.'),
+    'no_opponents': (SUMMARY, 'No opponents remain for {actor}.'),
+    'max_turns': (SUMMARY, 'Maximum number of turns reached.'),
+    'battle_end': (SUMMARY, 'Battle simulation finished.'),
+    'winner': (SUMMARY, 'The winner is {actor}, team ratings: {0} :: {1} {2} :: {3}'),
+    'attack': (DETAIL, '{actor} attacks {target}, dealing {0} damage, {target} has {1:.0f} hp  ,{2:.0f} armor left'),
+    'dodge': (DETAIL, '{actor} attacks {target}, but {target} dodges the attack'),
+    'stunned': (DETAIL, '{actor} is stunned and cannot attack'),
+    'killed': (SUMMARY, '{actor} has been killed'),
+    'defeated': (SUMMARY, '{actor} has been defeated'),
+    'effect_applied': (DETAIL, '{actor} has activated {0} for {1} turns'),
+    'effect_expired': (DEBUG, "{actor}'s {0} effect has worn off."),
+    'poison_tick': (DEBUG, '{actor}  -{0} hp'),
+    'poison_left': (DEBUG, '{actor} has been poisoned for {0} turns'),
+    'poison_cured': (DEBUG, '{actor} has been cured of poison'),
+    'out_of_chakra': (DETAIL, '{actor} is out of chakra cannot activate {0}.'),
+    'evasion': (DETAIL, '{actor} activates {0} for {1} turn(s), '),
+    'critical_strike': (DETAIL, '{actor} uses {0} on {target} dealing an extra {1} damage.'),
+    'poison': (DETAIL, '{actor} uses {0} on {target} for {1} turns (damage: {2}/turn).'),
+    'stun': (DETAIL, '{actor} uses {0} {target}, causing them to miss their next turn.'),
+    'heal_self': (DETAIL, '{actor} uses {0} on self for {1} HP.'),
+    'heal_others': (DETAIL, '{actor} uses {0} on {target} for {1} HP.'),
+    'buff': (DETAIL, '{actor} uses {0} to buff their armor by {1}.'),
+    'ai_turn': (DEBUG, "\n{actor}'s turn (AI):"),
+    'move_check': (DEBUG, 'checking to move player to {0}'),
+    'move': (DETAIL, 'AI {actor} moves to {0}'),
+    'targeting': (DEBUG, 'Targeting {target}'),
+    'out_of_range': (DETAIL, '{actor} target {target} is out of range!'),
+    'no_action': (DETAIL, '{actor} takes no action.'),
+    'no_targets': (DETAIL, 'No enemy targets in range!'),
+    'invalid_target': (DETAIL, 'Invalid target, skipping attack.'),
+    'unknown_controller': (DETAIL, '{actor} has an unrecognized controller ({0}), skipping turn.'),
+}
+
+
+class Event(NamedTuple):
+    """A compact battle event, turned into text only by render()"""
+    sequence: int
+    turn: int
+    kind: str
+    actor: Optional[str]
+    target: Optional[str]
+    values: Tuple[Any, ...]
+
+
+def render(event: Event) -> str:
+    """Human-readable text of an event"""
+    template = EVENT_TYPES[event.kind][1]
+    return template.format(*event.values, actor=event.actor, target=event.target)
+
+
+class EventLog:
+    """Bounded, leveled store of structured battle events.
+
+    Events above `level` are dropped at emit time without any formatting; at
+    most `capacity` events are kept (None keeps everything). With echo=True
+    every kept event is also rendered and printed as it happens.
+    """
+
+    def __init__(self, level: int = DEBUG, capacity: Optional[int] = DEFAULT_CAPACITY, echo: bool = False):
+        self.level = level
+        self.echo = echo
+        self._events: Deque[Event] = deque(maxlen=capacity)
+        self._sequence = 0
+
+    def enabled(self, kind: str) -> bool:
+        return EVENT_TYPES[kind][0] <= self.level
+
+    def emit(self, turn: int, kind: str, actor: Optional[str] = None, target: Optional[str] = None,
+             values: Tuple[Any, ...] = ()):
+        if EVENT_TYPES[kind][0] > self.level:
+            return
+        self._sequence += 1
+        event = Event(self._sequence, turn, kind, actor, target, values)
+        self._events.append(event)
+        if self.echo:
+            print(render(event))
+
+    @property
+    def last_sequence(self) -> int:
+        """Sequence number of the newest event, 0 before anything was kept"""
+        return self._sequence
+
+    def since(self, sequence: int) -> List[Event]:
+        """Kept events newer than `sequence`, oldest first"""
+        newer = []
+        for event in reversed(self._events):
+            if event.sequence <= sequence:
+                break
+            newer.append(event)
+        newer.reverse()
+        return newer
+
+    def render(self) -> List[str]:
+        """Text of every kept event, oldest first"""
+        return [render(event) for event in self._events]
+
+    def clear(self):
+        self._events.clear()
+
+    def __iter__(self) -> Iterator[Event]:
+        return iter(self._events)
+
+    def __len__(self):
+        return len(self._events)
+
+
+class NullEventLog(EventLog):
+    """Sink that keeps nothing, for headless battles"""
+
+    def __init__(self):
+        super().__init__(level=SILENT, capacity=0)
+
+    def emit(self, turn, kind, actor=None, target=None, values=()):
+        pass
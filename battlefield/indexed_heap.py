@@ -0,0 +1,91 @@
+from typing import Any, Dict, Hashable, List
+
+
+class IndexedHeap:
+    """Binary min-heap whose entries can be re-prioritised or removed by key in O(log n).
+
+    Entries are ordered by (priority, order); `order` breaks ties so that equal
+    priorities come out in a stable, caller-chosen order.
+    """
+
+    def __init__(self):
+        self._heap: List[list] = []  # [priority, order, key, value]
+        self._position: Dict[Hashable, int] = {}
+
+    def push(self, key: Hashable, value: Any, priority, order=0):
+        if key in self._position:
+            raise ValueError(f'Key {key} is already in the heap')
+        self._heap.append([priority, order, key, value])
+        self._position[key] = len(self._heap) - 1
+        self._sift_up(len(self._heap) - 1)
+
+    def update(self, key: Hashable, priority):
+        """Change the priority of an entry, a no-op for keys not in the heap"""
+        index = self._position.get(key)
+        if index is None:
+            return
+        entry = self._heap[index]
+        old_priority = entry[0]
+        entry[0] = priority
+        if priority < old_priority:
+            self._sift_up(index)
+        elif priority > old_priority:
+            self._sift_down(index)
+
+    def remove(self, key: Hashable):
+        """Remove an entry, a no-op for keys not in the heap"""
+        index = self._position.pop(key, None)
+        if index is None:
+            return
+        last = self._heap.pop()
+        if index < len(self._heap):
+            self._heap[index] = last
+            self._position[last[2]] = index
+            self._sift_up(index)
+            self._sift_down(self._position[last[2]])
+
+    def peek(self) -> Any:
+        """Value of the entry with the lowest priority"""
+        if not self._heap:
+            raise IndexError('peek from an empty heap')
+        return self._heap[0][3]
+
+    def clear(self):
+        self._heap.clear()
+        self._position.clear()
+
+    def __len__(self):
+        return len(self._heap)
+
+    def __contains__(self, key: Hashable):
+        return key in self._position
+
+    def _less(self, i: int, j: int) -> bool:
+        a, b = self._heap[i], self._heap[j]
+        return (a[0], a[1]) < (b[0], b[1])
+
+    def _swap(self, i: int, j: int):
+        heap = self._heap
+        heap[i], heap[j] = heap[j], heap[i]
+        self._position[heap[i][2]] = i
+        self._position[heap[j][2]] = j
+
+    def _sift_up(self, index: int):
+        while index > 0:
+            parent = (index - 1) // 2
+            if not self._less(index, parent):
+                break
+            self._swap(index, parent)
+            index = parent
+
+    def _sift_down(self, index: int):
+        size = len(self._heap)
+        while True:
+            smallest = index
+            for child in (2 * index + 1, 2 * index + 2):
+                if child < size and self._less(child, smallest):
+                    smallest = child
+            if smallest == index:
+                break
+            self._swap(index, smallest)
+            index = smallest
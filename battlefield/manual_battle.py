@@ -1,50 +1,52 @@
-import random
 from typing import List, Tuple, Optional
 from characters import Character, Position
 from teams import Team
 from handlers import SpecialAbilityHandler
 from battle_bot import BattleAI
 from engine import AutoBattleField
+from events import EventLog
+from occupancy import OccupancyGrid
+from neighborhoods import MANHATTAN, neighborhood
 
 
 class ManualBattleField(AutoBattleField):
-    def __init__(self, human_team: Team, ai_team: Team, grid_size: Tuple[int, int] = (20, 10)):
-        super().__init__(human_team, ai_team, 3)
+    def __init__(self, human_team: Team, ai_team: Team, grid_size: Tuple[int, int] = (20, 10),
+                 seed: Optional[int] = None, events: Optional[EventLog] = None):
+        super().__init__(human_team, ai_team, 3, seed=seed, events=events)
         self.human_team = human_team
         self.ai_team = ai_team
         self.width, self.height = grid_size
+        self.grid = OccupancyGrid(self.width, self.height)
         self.turn_count = 1
         # We'll consider human_team always plays first.
         self.current_active_team = human_team
         if human_team.control == 'ai':
-            self.human_team_controller = BattleAI(difficulty="easy")
-        self.commentary: List[str] = []
+            self.human_team_controller = BattleAI(difficulty="easy", rng=self.rng.spawn("human_ai"))
         # self.special_ability_handler = SpecialAbilityHandler(self)
         # Create an AI instance to control the AI team.
-        self.ai_controller = BattleAI(difficulty="easy")
+        self.ai_controller = BattleAI(difficulty="easy", rng=self.rng.spawn("ai"))
         self._initialize_positions()
 
     def _initialize_positions(self) -> None:
         """Place teams on opposite sides of the grid and assign controllers."""
-        # Assign positions and controllers for human team
-        for character in self.human_team.characters:
-            character.position = Position()
-            character.controller = "human" if self.human_team.control == "human" else "ai"
-        # Assign positions and controllers for AI team
-        for character in self.ai_team.characters:
-            character.position = Position()
-            character.controller = "ai"
-        # Place human team on the left side
-        for i, character in enumerate(self.human_team.characters):
-            y = (i + 1) * (self.height // (len(self.human_team.characters) + 1))
-            character.position = Position(1, y)
-        # Place AI team on the right side
-        for i, character in enumerate(self.ai_team.characters):
-            y = (i + 1) * (self.height // (len(self.ai_team.characters) + 1))
-            character.position = Position(self.width - 2, y)
+        for team, x in [(self.human_team, 1), (self.ai_team, self.width - 2)]:
+            spacing = max(1, self.height // (len(team.characters) + 1))
+            for i, character in enumerate(team.characters):
+                character.controller = "human" if team is self.human_team and team.control == "human" else "ai"
+                # characters of a team that fought before are still tracked by that battle's grid
+                if character.grid is not None:
+                    character.grid.remove(character)
+                # spread the team down its column, a team taller than the grid spills onto the nearest free cells
+                y = min((i + 1) * spacing, self.height - 1)
+                character.position = Position(*self.grid.nearest_free(x, y))
+                self.grid.place(character)
 
     def display_grid(self) -> None:
         """Display the current state of the battlefield."""
+        print(self.render_grid())
+
+    def render_grid(self) -> str:
+        """The current state of the battlefield as text."""
         grid = [['.'] * self.width for _ in range(self.height)]
         # Mark human team positions
         for character in self.human_team.characters:
@@ -56,38 +58,46 @@ class ManualBattleField(AutoBattleField):
             if character.position and character.position.x is not None and character.position.y is not None:
                 x, y = int(character.position.x), int(character.position.y)
                 grid[y][x] = 'A'  # A for AI
-        print("\n" + "=" * (self.width * 2))
-        for row in grid:
-            print(" ".join(row))
-        print("=" * (self.width * 2) + "\n")
+        lines = ["\n" + "=" * (self.width * 2)]
+        lines.extend(" ".join(row) for row in grid)
+        lines.append("=" * (self.width * 2) + "\n")
+        return "\n".join(lines)
 
     def manhattan_distance(self, pos1: Position, pos2: Position) -> int:
         """The actual implementation is a chebysev distance"""
         return max(abs(pos1.x - pos2.x), abs(pos1.y - pos2.y))
 
     def is_valid_move(self, character: Character, new_pos: Position) -> bool:
-        if not (0 <= new_pos.x < self.width and 0 <= new_pos.y < self.height):
+        if not self.grid.in_bounds(new_pos.x, new_pos.y):
+            return False
+        if not self.grid.is_free(new_pos.x, new_pos.y, ignore=character):
             return False
-        for team in [self.human_team, self.ai_team]:
-            for other in team.characters:
-                if other != character and other.position == new_pos:
-                    return False
         move_distance = self.manhattan_distance(character.position, new_pos)
         return move_distance <= character.range #type:ignore
 
     def get_valid_moves(self, character: Character) -> List[Position]:
-        valid_moves = []
         max_move = character.get_attribute('speed') // 100
-        for dx in range(-max_move, max_move + 1):
-            for dy in range(-max_move, max_move + 1):
-                if abs(dx) + abs(dy) <= max_move:
-                    new_x = character.position.x + dx  # type: ignore
-                    new_y = character.position.y + dy  # type: ignore
-                    new_pos = Position(new_x, new_y)
-                    if self.is_valid_move(character, new_pos):
-                        valid_moves.append(new_pos)
+        origin = character.position
+        attack_range = character.range  # type: ignore
+        valid_moves = []
+        # cells are already clipped to the grid, so only occupancy and range are left to check
+        for x, y in neighborhood((origin.x, origin.y), max_move, MANHATTAN, (self.width, self.height)):
+            if self.grid.is_free(x, y, ignore=character) and \
+                    max(abs(x - origin.x), abs(y - origin.y)) <= attack_range:
+                valid_moves.append(Position(x, y))
         return valid_moves
 
+    def enemies_in_range(self, character: Character, radius: int) -> List[Character]:
+        """Enemies within Chebyshev distance radius of a character"""
+        enemy_team = self.ai_team if character.team is self.human_team else self.human_team
+        return self.grid.within(character.position, radius, team=enemy_team)
+
+    def check_player_status(self, player: Character):
+        super().check_player_status(player)
+        if player.team is None:
+            # defeated characters no longer block their cell
+            self.grid.remove(player)
+
     def is_in_range(self, attacker: Character, target: Character) -> bool:
         distance = self.manhattan_distance(attacker.position, target.position)
         attack_range = attacker.get_attribute(
@@ -99,13 +109,9 @@ class ManualBattleField(AutoBattleField):
         pass
 
     def _human_attack(self, character: Character) -> None:
-        valid_targets = []
-        enemy_team = self.ai_team
-        for target in enemy_team.characters:
-            if self.is_in_range(character, target):
-                valid_targets.append(target)
+        valid_targets = self.enemies_in_range(character, character.get_attribute('range'))
         if not valid_targets:
-            self.log("No enemy targets in range!")
+            self.emit("no_targets", character.name)
             return
         print("\nValid targets:")
         for i, target in enumerate(valid_targets):
@@ -115,14 +121,15 @@ class ManualBattleField(AutoBattleField):
             target = valid_targets[int(target_choice)]
             self._execute_attack(character, target)
         except (ValueError, IndexError):
-            self.log("Invalid target, skipping attack.")
+            self.emit("invalid_target", character.name)
 
     def _execute_attack(self, player: Character, opponent: Character):
         dmg, armor = self.attack(player, opponent)
-        comment = f'{player.name} attacks {opponent.name}, dealing {dmg} damage, {opponent.name} has {opponent.get_attribute("hp"):.0f} hp  ,{opponent.get_attribute("armor"):.0f} armor left'
         if dmg == 0:
-            comment = f'{player.name} attacks {opponent.name}, but {opponent.name} dodges the attack'
-        self.log(comment, dest='console')
+            self.emit('dodge', player.name, opponent.name)
+        else:
+            self.emit('attack', player.name, opponent.name, dmg,
+                      opponent.get_attribute('hp'), opponent.get_attribute('armor'))
         self.check_player_status(opponent)
 
     def _execute_special_attack(self, character, target):
@@ -130,13 +137,13 @@ class ManualBattleField(AutoBattleField):
         if len(abilities) == 0:
             pass 
         else:
-            ability = random.choice(character.special_abilities)
+            ability = self.rng.choice(character.special_abilities)
             self.special_ability_handler.execute(ability, character, target)
         self.check_player_status(target)
 
     def ai_turn(self, character: Character) -> None:
         """Execute an AI-controlled turn using the BattleAI module."""
-        self.log(f"\n{character.name}'s turn (AI):")
+        self.emit("ai_turn", character.name)
         # Determine proper ally and enemy teams based on character membership.
         if character in self.human_team.characters:
             ally_team = self.human_team
@@ -145,7 +152,8 @@ class ManualBattleField(AutoBattleField):
             ally_team = self.ai_team
             enemy_team = self.human_team
 
-        # Determine new position using the AI.
+        # Determine new position using the AI, flow fields are shared for the rest of the turn.
+        self.ai_controller.paths.begin_turn(self.turn_count)
         new_pos, target = self.ai_controller.choose_move(
             character,
             ally_team.characters,
@@ -153,26 +161,26 @@ class ManualBattleField(AutoBattleField):
             (self.width, self.height)
         )
 
-        self.log(f"checking to move player to {new_pos}")
+        self.emit("move_check", character.name, None, new_pos)
         if new_pos and self.is_valid_move(character, Position(*new_pos)):
             # new_pos is assumed to be a tuple (x, y)
             character.position = Position(new_pos[0], new_pos[1])
-            self.log(f"AI {character.name} moves to {character.position}")
+            self.emit("move", character.name, None, (new_pos[0], new_pos[1]))
 
         # Choose an attack target from the enemy team.
         # target = self.ai_controller.choose_attack_target(
         #     character, enemy_team.characters)
         if target:
-            self.log(f'Targeting {target}')
+            self.emit("targeting", character.name, target.name)
             if self.is_in_range(character, target):
                 if self.turn_count % 3 == 0:
                     self._execute_special_attack(character, target)
                 else:
                     self._execute_attack(character, target)
             else:
-                self.log(f"{character.name} target {target.name} is out of range!")
+                self.emit("out_of_range", character.name, target.name)
         else:
-            self.log(f"{character.name} takes no action.")
+            self.emit("no_action", character.name)
 
     def agent_turn(self, character: Character) -> None:
         """
@@ -184,8 +192,7 @@ class ManualBattleField(AutoBattleField):
         elif character.controller == "ai":
             self.ai_turn(character)
         else:
-            self.log(
-                f"{character.name} has an unrecognized controller ({character.controller}), skipping turn.")
+            self.emit("unknown_controller", character.name, None, character.controller)
 
     def next_turn(self) -> None:
         """
@@ -193,8 +200,10 @@ class ManualBattleField(AutoBattleField):
         with each turn driven by its assigned controller.
         """
         for team in [self.human_team, self.ai_team]:
-            for character in team.characters:
+            # a copy, characters that fall during the turn are removed from their team
+            for character in list(team.characters):
                 if character.get_attribute('hp') > 0:
                     self.agent_turn(character)
         self.turn_count += 1
-        self.log(f"Turn {self.turn_count} completed.")
+        self.resolve_status_effects()
+        self.emit("turn_completed", None, None, self.turn_count)
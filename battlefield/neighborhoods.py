@@ -0,0 +1,46 @@
+from functools import lru_cache
+from typing import FrozenSet, Optional, Tuple
+
+Cell = Tuple[int, int]
+
+CHEBYSHEV = 'chebyshev'
+MANHATTAN = 'manhattan'
+
+
+@lru_cache(maxsize=None)
+def offsets(radius: int, metric: str = CHEBYSHEV) -> Tuple[Cell, ...]:
+    """(dx, dy) offsets within radius of the origin, dx-major like the nested loops they replace"""
+    if metric not in (CHEBYSHEV, MANHATTAN):
+        raise ValueError(f'Unknown distance metric {metric}')
+    table = []
+    for dx in range(-radius, radius + 1):
+        for dy in range(-radius, radius + 1):
+            distance = max(abs(dx), abs(dy)) if metric == CHEBYSHEV else abs(dx) + abs(dy)
+            if distance <= radius:
+                table.append((dx, dy))
+    return tuple(table)
+
+
+@lru_cache(maxsize=16384)
+def neighborhood(center: Cell, radius: int, metric: str = CHEBYSHEV,
+                 bounds: Optional[Tuple[int, int]] = None, include_center: bool = True) -> Tuple[Cell, ...]:
+    """Cells within radius of center, in offsets() order, clipped to a (width, height) grid when bounds are given.
+
+    The result is cached and shared, so treat it as read-only.
+    """
+    x, y = center
+    cells = []
+    for dx, dy in offsets(radius, metric):
+        if not include_center and dx == 0 and dy == 0:
+            continue
+        nx, ny = x + dx, y + dy
+        if bounds is None or (0 <= nx < bounds[0] and 0 <= ny < bounds[1]):
+            cells.append((nx, ny))
+    return tuple(cells)
+
+
+@lru_cache(maxsize=16384)
+def neighborhood_set(center: Cell, radius: int, metric: str = CHEBYSHEV,
+                     bounds: Optional[Tuple[int, int]] = None, include_center: bool = True) -> FrozenSet[Cell]:
+    """neighborhood() as a frozenset, for membership tests and set algebra"""
+    return frozenset(neighborhood(center, radius, metric, bounds, include_center))
@@ -0,0 +1,116 @@
+from typing import Dict, Iterable, List, Optional
+
+from neighborhoods import MANHATTAN, Cell, neighborhood
+
+
+def _cell(position) -> Optional[Cell]:
+    if position is None or position[0] is None or position[1] is None:
+        return None
+    return int(position[0]), int(position[1])
+
+
+class OccupancyGrid:
+    """Spatial hash of which character stands on which grid cell.
+
+    Characters placed on the grid keep it up to date themselves: assigning
+    `character.position` moves them to the new cell. Cell lookups are O(1) and
+    range queries cost the smaller of the scanned area and the number of
+    placed characters.
+    """
+
+    def __init__(self, width: int, height: int):
+        self.width = width
+        self.height = height
+        self._cells: Dict[Cell, object] = {}
+        self._cell_of: Dict[int, Cell] = {}  # id(character) -> cell
+
+    def in_bounds(self, x: int, y: int) -> bool:
+        return 0 <= x < self.width and 0 <= y < self.height
+
+    def place(self, character):
+        """Put a character on the cell of its current position and start tracking it"""
+        cell = _cell(character.position)
+        if cell is None:
+            raise ValueError(f'{character.name} has no position to place')
+        occupant = self._cells.get(cell)
+        if occupant is not None and occupant is not character:
+            raise ValueError(f'Cell {cell} is already occupied by {occupant.name}')
+        self._cells[cell] = character
+        self._cell_of[id(character)] = cell
+        character.grid = self
+
+    def move(self, character, position):
+        """Called by Character when its position changes"""
+        old = self._cell_of.pop(id(character), None)
+        if old is not None and self._cells.get(old) is character:
+            del self._cells[old]
+        cell = _cell(position)
+        if cell is None:
+            return
+        occupant = self._cells.get(cell)
+        if occupant is not None and occupant is not character:
+            # put it back so the grid stays consistent before failing
+            if old is not None:
+                self._cells[old] = character
+                self._cell_of[id(character)] = old
+            raise ValueError(f'Cell {cell} is already occupied by {occupant.name}')
+        self._cells[cell] = character
+        self._cell_of[id(character)] = cell
+
+    def remove(self, character):
+        """Stop tracking a character, freeing its cell"""
+        cell = self._cell_of.pop(id(character), None)
+        if cell is not None and self._cells.get(cell) is character:
+            del self._cells[cell]
+        if character.grid is self:
+            character.grid = None
+
+    def at(self, x: int, y: int):
+        """The character on a cell, None when it is free"""
+        return self._cells.get((x, y))
+
+    def is_free(self, x: int, y: int, ignore=None) -> bool:
+        occupant = self._cells.get((x, y))
+        return occupant is None or occupant is ignore
+
+    def nearest_free(self, x: int, y: int) -> Cell:
+        """The free cell closest to (x, y) in Manhattan distance, (x, y) itself when it is free"""
+        for radius in range(self.width + self.height):
+            for cell in neighborhood((x, y), radius, MANHATTAN, (self.width, self.height)):
+                if abs(cell[0] - x) + abs(cell[1] - y) == radius and cell not in self._cells:
+                    return cell
+        raise ValueError(f'No free cell left on the {self.width}x{self.height} grid')
+
+    def occupied(self) -> Iterable[Cell]:
+        return self._cells.keys()
+
+    def within(self, center, radius: int, team=None) -> List:
+        """Characters within Chebyshev distance radius of center, by row then column.
+
+        With team given only members of that team are returned.
+        """
+        cx, cy = _cell(center)
+        min_x, max_x = max(0, cx - radius), min(self.width - 1, cx + radius)
+        min_y, max_y = max(0, cy - radius), min(self.height - 1, cy + radius)
+        found = []
+        if (max_x - min_x + 1) * (max_y - min_y + 1) <= len(self._cells):
+            cells = self._cells
+            for y in range(min_y, max_y + 1):
+                for x in range(min_x, max_x + 1):
+                    occupant = cells.get((x, y))
+                    if occupant is not None:
+                        found.append(occupant)
+        else:
+            hits = [(cell[1], cell[0], occupant) for cell, occupant in self._cells.items()
+                    if min_x <= cell[0] <= max_x and min_y <= cell[1] <= max_y]
+            hits.sort(key=lambda hit: (hit[0], hit[1]))
+            found = [occupant for _, _, occupant in hits]
+        if team is not None:
+            found = [occupant for occupant in found if occupant.team is team]
+        return found
+
+    def __contains__(self, character):
+        return id(character) in self._cell_of
+
+    def __len__(self):
+        return len(self._cells)
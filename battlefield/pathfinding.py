@@ -0,0 +1,176 @@
+import heapq
+from collections import OrderedDict, deque
+from functools import lru_cache
+from typing import AbstractSet, Dict, List, Optional, Tuple
+
+from neighborhoods import CHEBYSHEV, offsets
+
+Cell = Tuple[int, int]
+
+UNREACHABLE = -1
+# king moves, the same steps BattleAI.move_towards takes
+STEPS = tuple(offset for offset in offsets(1, CHEBYSHEV) if offset != (0, 0))
+
+
+def chebyshev(a: Cell, b: Cell) -> int:
+    return max(abs(a[0] - b[0]), abs(a[1] - b[1]))
+
+
+@lru_cache(maxsize=8)
+def _neighbour_table(width: int, height: int) -> Tuple[Tuple[int, ...], ...]:
+    """In-grid king-move neighbours of every cell, by flat index y * width + x"""
+    table = []
+    for y in range(height):
+        for x in range(width):
+            table.append(tuple((y + dy) * width + x + dx for dx, dy in STEPS
+                               if 0 <= x + dx < width and 0 <= y + dy < height))
+    return tuple(table)
+
+
+class FlowField:
+    """Step distances from every cell to one target cell, by breadth-first search.
+
+    Blocked cells get a distance but are not expanded through, so a unit
+    standing on one can still read which way to go. Walking downhill from any
+    cell follows a shortest path around the cells that were blocked when the
+    field was built. The search is lazy: it only runs as far out as the
+    distances asked for so far, and resumes when a farther cell is queried.
+    """
+
+    def __init__(self, target: Cell, grid_size: Tuple[int, int], blocked: AbstractSet[Cell]):
+        self.target = target
+        self.width, self.height = grid_size
+        self._neighbours = _neighbour_table(self.width, self.height)
+        self._blocked = {y * self.width + x for x, y in blocked}
+        self.distances = [UNREACHABLE] * (self.width * self.height)
+        origin = target[1] * self.width + target[0]
+        self.distances[origin] = 0
+        self._queue = deque([origin])
+
+    def _expand(self, index: int):
+        """Continue the search until the cell at index has its distance, or nothing is left"""
+        distances, neighbours, blocked, queue = self.distances, self._neighbours, self._blocked, self._queue
+        while distances[index] == UNREACHABLE and queue:
+            current = queue.popleft()
+            next_distance = distances[current] + 1
+            for neighbour in neighbours[current]:
+                if distances[neighbour] == UNREACHABLE:
+                    distances[neighbour] = next_distance
+                    if neighbour not in blocked:
+                        queue.append(neighbour)
+
+    def distance(self, cell: Cell) -> int:
+        index = cell[1] * self.width + cell[0]
+        if self.distances[index] == UNREACHABLE:
+            self._expand(index)
+        return self.distances[index]
+
+    def walk(self, start: Cell, steps: int, blocked: AbstractSet[Cell], stop_distance: int = 1) -> List[Cell]:
+        """Up to `steps` cells downhill from start, avoiding the currently blocked cells.
+
+        Stops once stop_distance from the target is reached or no free neighbour is closer.
+        """
+        path = []
+        current = start
+        distance = self.distance(current)
+        # breadth-first order settles every cell closer than start before start itself,
+        # so the walk below can read distances without resuming the search
+        distances, neighbours, width = self.distances, self._neighbours, self.width
+        while len(path) < steps and distance > stop_distance:
+            best, best_key = None, None
+            for neighbour in neighbours[current[1] * width + current[0]]:
+                cell_distance = distances[neighbour]
+                if cell_distance == UNREACHABLE or cell_distance >= distance:
+                    continue
+                cell = (neighbour % width, neighbour // width)
+                if cell in blocked:
+                    continue
+                # among equally short continuations prefer the straightest one
+                key = (cell_distance, abs(cell[0] - self.target[0]) + abs(cell[1] - self.target[1]))
+                if best_key is None or key < best_key:
+                    best, best_key = cell, key
+            if best is None:
+                break
+            path.append(best)
+            current, distance = best, best_key[0]
+        return path
+
+
+def astar(start: Cell, target: Cell, grid_size: Tuple[int, int], blocked: AbstractSet[Cell],
+          stop_distance: int = 1, max_expansions: Optional[int] = None) -> List[Cell]:
+    """Shortest king-move path from start to any free cell within stop_distance of target.
+
+    The path excludes start; it is empty when start already qualifies or no cell can be reached.
+    """
+    if chebyshev(start, target) <= stop_distance:
+        return []
+    width, height = grid_size
+    came_from: Dict[Cell, Cell] = {}
+    cost = {start: 0}
+    frontier = [(chebyshev(start, target) - stop_distance, 0, start)]
+    expansions = 0
+    while frontier:
+        _, steps, current = heapq.heappop(frontier)
+        if steps > cost[current]:
+            continue
+        if chebyshev(current, target) <= stop_distance:
+            path = [current]
+            while path[-1] in came_from and came_from[path[-1]] != start:
+                path.append(came_from[path[-1]])
+            path.reverse()
+            return path
+        expansions += 1
+        if max_expansions is not None and expansions > max_expansions:
+            break
+        for dx, dy in STEPS:
+            cell = (current[0] + dx, current[1] + dy)
+            if not (0 <= cell[0] < width and 0 <= cell[1] < height) or cell in blocked:
+                continue
+            if steps + 1 < cost.get(cell, steps + 2):
+                cost[cell] = steps + 1
+                came_from[cell] = current
+                heapq.heappush(frontier, (steps + 1 + chebyshev(cell, target) - stop_distance, steps + 1, cell))
+    return []
+
+
+class PathPlanner:
+    """Hands out shared flow fields, one per target cell per turn, with A* as a fallback.
+
+    Every unit chasing the same enemy during a turn walks the same field; the
+    occupancy it was built with may be stale by the time a later unit moves,
+    in which case the walk stops short and A* is run on the current occupancy.
+    """
+
+    def __init__(self, max_fields: int = 64):
+        self.max_fields = max_fields
+        self.turn = None
+        self._fields: 'OrderedDict[Tuple[Cell, Tuple[int, int]], FlowField]' = OrderedDict()
+
+    def begin_turn(self, turn: int):
+        """Drop the fields of earlier turns"""
+        if turn != self.turn:
+            self.turn = turn
+            self._fields.clear()
+
+    def field(self, target: Cell, grid_size: Tuple[int, int], blocked: AbstractSet[Cell]) -> FlowField:
+        key = (target, tuple(grid_size))
+        field = self._fields.get(key)
+        if field is None:
+            field = self._fields[key] = FlowField(target, grid_size, blocked)
+            if len(self._fields) > self.max_fields:
+                self._fields.popitem(last=False)
+        else:
+            self._fields.move_to_end(key)
+        return field
+
+    def path(self, start: Cell, target: Cell, steps: int, grid_size: Tuple[int, int],
+             blocked: AbstractSet[Cell], stop_distance: int = 1) -> List[Cell]:
+        """Up to `steps` cells from start toward target over free cells"""
+        field = self.field(target, grid_size, blocked)
+        path = field.walk(start, steps, blocked, stop_distance)
+        if len(path) < steps and (not path or field.distance(path[-1]) > stop_distance):
+            # the walk got stuck on cells that were free when the field was built
+            detour = astar(start, target, grid_size, blocked, stop_distance)
+            if detour:
+                path = detour[:steps]
+        return path
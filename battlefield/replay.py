@@ -0,0 +1,402 @@
+import json
+import mmap
+import struct
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional, Tuple
+
+from teams import Team
+from characters import Position
+from events import EVENT_TYPES, Event
+
+# File layout
+#   header    MAGIC, u32 header length, JSON header (seed, moves_per_turn, stat and
+#             event kind tables, team snapshots taken when recording started)
+#   records   a packed stream of tagged records: turn markers, state deltas,
+#             removals, events and a keyframe every `keyframe_interval` turns
+#   index     u32 keyframe count, then (u32 turn, u64 offset) per keyframe
+#   trailer   u64 index offset, INDEX_MAGIC
+MAGIC = b'SZRP\x01'
+INDEX_MAGIC = b'SZRX'
+
+TURN = 1  # u32 turn
+DELTA = 2  # u16 slot, u8 stat, f64 new value
+MOVE = 3  # u16 slot, i32 x, i32 y
+REMOVE = 4  # u16 slot
+EVENT = 5  # u32 turn, u8 kind, actor, target, u8 value count, values
+KEYFRAME = 6  # u32 turn, then per slot: u8 alive, i32 x, i32 y, f64 per stat
+
+NO_POSITION = -2 ** 31
+
+_u8 = struct.Struct('<B')
+_u16 = struct.Struct('<H')
+_u32 = struct.Struct('<I')
+_u64 = struct.Struct('<Q')
+_i64 = struct.Struct('<q')
+_f64 = struct.Struct('<d')
+_delta = struct.Struct('<BHBd')
+_move = struct.Struct('<BHii')
+_remove = struct.Struct('<BH')
+_turn = struct.Struct('<BI')
+_slot_head = struct.Struct('<Bii')
+_event_head = struct.Struct('<BIB')
+_index_entry = struct.Struct('<IQ')
+_trailer = struct.Struct('<Q4s')
+
+
+class ReplayState:
+    """Full state of every character slot at some turn"""
+
+    def __init__(self, turn: int, stats: List[List[float]], alive: List[bool],
+                 positions: List[Optional[Tuple[int, int]]]):
+        self.turn = turn
+        self.stats = stats  # stats[slot][stat index]
+        self.alive = alive
+        self.positions = positions
+
+    def copy(self) -> 'ReplayState':
+        return ReplayState(self.turn, [list(values) for values in self.stats], list(self.alive),
+                           list(self.positions))
+
+
+def _character_state(character, stat_names: List[str]) -> Tuple[List[float], bool, Optional[Tuple[int, int]]]:
+    stats = []
+    for name in stat_names:
+        try:
+            stats.append(float(character.get_attribute(name)))
+        except ValueError:
+            stats.append(float('nan'))
+    position = character.position
+    if position is None or position.x is None or position.y is None:
+        coordinates = None
+    else:
+        coordinates = (int(position.x), int(position.y))
+    return stats, character.team is not None, coordinates
+
+
+def _pack_value(value: Any) -> bytes:
+    if value is None:
+        return b'n'
+    if isinstance(value, (bool, int)):
+        return b'q' + _i64.pack(int(value))
+    if isinstance(value, float):
+        return b'd' + _f64.pack(value)
+    if isinstance(value, str):
+        data = value.encode('utf-8')
+        return b's' + _u16.pack(len(data)) + data
+    if isinstance(value, (list, tuple)):
+        return (b'l' if isinstance(value, list) else b't') + _u16.pack(len(value)) + b''.join(
+            _pack_value(item) for item in value)
+    return _pack_value(str(value))
+
+
+def _unpack_value(buffer, offset: int) -> Tuple[Any, int]:
+    tag = buffer[offset:offset + 1]
+    offset += 1
+    if tag == b'n':
+        return None, offset
+    if tag == b'q':
+        return _i64.unpack_from(buffer, offset)[0], offset + 8
+    if tag == b'd':
+        return _f64.unpack_from(buffer, offset)[0], offset + 8
+    if tag == b's':
+        size = _u16.unpack_from(buffer, offset)[0]
+        offset += 2
+        return bytes(buffer[offset:offset + size]).decode('utf-8'), offset + size
+    if tag in (b'l', b't'):
+        count = _u16.unpack_from(buffer, offset)[0]
+        offset += 2
+        items = []
+        for _ in range(count):
+            item, offset = _unpack_value(buffer, offset)
+            items.append(item)
+        return (items if tag == b'l' else tuple(items)), offset
+    raise ValueError(f'Corrupt replay value tag {tag!r}')
+
+
+class ReplayWriter:
+    """Records a battle into the compact binary replay format.
+
+    Call capture() after every turn (AutoBattleField.run_battle does it through
+    its on_turn hook, see record_battle) and close() at the end. Only what
+    changed since the previous capture is written, plus a full keyframe every
+    keyframe_interval turns so readers can seek without replaying from the start.
+    """
+
+    def __init__(self, path: str, battlefield, keyframe_interval: int = 10):
+        self.battlefield = battlefield
+        self.keyframe_interval = keyframe_interval
+        self._slots = list(battlefield.team1.characters) + list(battlefield.team2.characters)
+        self._slot_by_name: Dict[str, int] = {}
+        for slot, character in enumerate(self._slots):
+            self._slot_by_name.setdefault(character.name, slot)
+        self.stat_names: List[str] = []
+        for character in self._slots:
+            for attribute in character.attributes:
+                if attribute.name not in self.stat_names:
+                    self.stat_names.append(attribute.name)
+        self._kinds = list(EVENT_TYPES)
+        self._kind_codes = {kind: code for code, kind in enumerate(self._kinds)}
+        self._last_sequence = battlefield.events.last_sequence
+        self._keyframes: List[Tuple[int, int]] = []
+        self._file: BinaryIO = open(path, 'wb')
+
+        header = json.dumps({
+            'seed': battlefield.seed,
+            'moves_per_turn': battlefield.moves_per_turn,
+            'keyframe_interval': keyframe_interval,
+            'team_sizes': [battlefield.team1.count(), battlefield.team2.count()],
+            'stats': self.stat_names,
+            'event_kinds': self._kinds,
+            'teams': [battlefield.team1.to_json(), battlefield.team2.to_json()],
+        }).encode('utf-8')
+        self._file.write(MAGIC + _u32.pack(len(header)) + header)
+        self._state = self._snapshot()
+        self._write_keyframe(battlefield.turn_count)
+
+    def _snapshot(self) -> ReplayState:
+        stats, alive, positions = [], [], []
+        for character in self._slots:
+            values, is_alive, position = _character_state(character, self.stat_names)
+            stats.append(values)
+            alive.append(is_alive)
+            positions.append(position)
+        return ReplayState(self.battlefield.turn_count, stats, alive, positions)
+
+    def _write_keyframe(self, turn: int):
+        self._keyframes.append((turn, self._file.tell()))
+        chunks = [_turn.pack(KEYFRAME, turn)]
+        for slot in range(len(self._slots)):
+            x, y = self._state.positions[slot] or (NO_POSITION, NO_POSITION)
+            chunks.append(_slot_head.pack(int(self._state.alive[slot]), x, y))
+            chunks.append(struct.pack(f'<{len(self.stat_names)}d', *self._state.stats[slot]))
+        self._file.write(b''.join(chunks))
+
+    def _pack_name(self, name: Optional[str]) -> bytes:
+        """Character names are written as their slot, anything else inline"""
+        if name is None:
+            return b'n'
+        slot = self._slot_by_name.get(name)
+        if slot is not None:
+            return b'c' + _u16.pack(slot)
+        return _pack_value(name)
+
+    def _pack_event(self, event: Event) -> bytes:
+        return b''.join([
+            _event_head.pack(EVENT, event.turn, self._kind_codes[event.kind]),
+            self._pack_name(event.actor), self._pack_name(event.target),
+            _u8.pack(len(event.values)), *(_pack_value(value) for value in event.values),
+        ])
+
+    def capture(self):
+        """Record everything that happened since the previous capture as the current turn"""
+        turn = self.battlefield.turn_count
+        # a second capture within a turn (close() picking up the winner) extends it
+        chunks = [_turn.pack(TURN, turn)] if turn != self._state.turn else []
+        for event in self.battlefield.events.since(self._last_sequence):
+            chunks.append(self._pack_event(event))
+        self._last_sequence = self.battlefield.events.last_sequence
+
+        current = self._snapshot()
+        for slot in range(len(self._slots)):
+            old_stats, new_stats = self._state.stats[slot], current.stats[slot]
+            for index, value in enumerate(new_stats):
+                if value != old_stats[index] and not (value != value and old_stats[index] != old_stats[index]):
+                    chunks.append(_delta.pack(DELTA, slot, index, value))
+            position = current.positions[slot]
+            if position != self._state.positions[slot]:
+                x, y = position or (NO_POSITION, NO_POSITION)
+                chunks.append(_move.pack(MOVE, slot, x, y))
+            if self._state.alive[slot] and not current.alive[slot]:
+                chunks.append(_remove.pack(REMOVE, slot))
+        self._file.write(b''.join(chunks))
+        self._state = current
+        if turn - self._keyframes[-1][0] >= self.keyframe_interval:
+            self._write_keyframe(turn)
+
+    def close(self):
+        """Write the keyframe index and close the file"""
+        if self._file.closed:
+            return
+        if self.battlefield.events.last_sequence != self._last_sequence:
+            # pick up what was logged after the final turn, e.g. the winner
+            self.capture()
+        index_offset = self._file.tell()
+        chunks = [_u32.pack(len(self._keyframes))]
+        chunks.extend(_index_entry.pack(turn, offset) for turn, offset in self._keyframes)
+        chunks.append(_trailer.pack(index_offset, INDEX_MAGIC))
+        self._file.write(b''.join(chunks))
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class ReplayReader:
+    """Memory-maps a replay file and reconstructs the battle at any recorded turn"""
+
+    def __init__(self, path: str):
+        self._file = open(path, 'rb')
+        self._buffer = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        buffer = self._buffer
+        if buffer[:len(MAGIC)] != MAGIC:
+            raise ValueError(f'{path} is not a battle replay')
+        header_size = _u32.unpack_from(buffer, len(MAGIC))[0]
+        self._records_start = len(MAGIC) + 4 + header_size
+        self.header = json.loads(bytes(buffer[len(MAGIC) + 4:self._records_start]).decode('utf-8'))
+        self.seed = self.header['seed']
+        self.moves_per_turn = self.header['moves_per_turn']
+        self.stat_names: List[str] = self.header['stats']
+        self._kinds: List[str] = self.header['event_kinds']
+        self._names = [character['name'] for team in self.header['teams'] for character in team['characters']]
+        self._slot_count = len(self._names)
+
+        index_offset, magic = _trailer.unpack_from(buffer, len(buffer) - _trailer.size)
+        if magic != INDEX_MAGIC:
+            raise ValueError(f'{path} has no keyframe index, was the writer closed?')
+        count = _u32.unpack_from(buffer, index_offset)[0]
+        self.keyframes: List[Tuple[int, int]] = [
+            _index_entry.unpack_from(buffer, index_offset + 4 + i * _index_entry.size) for i in range(count)]
+        self._records_end = index_offset
+
+    @property
+    def first_turn(self) -> int:
+        return self.keyframes[0][0]
+
+    def _read_keyframe(self, offset: int) -> Tuple[ReplayState, int]:
+        buffer = self._buffer
+        turn = _turn.unpack_from(buffer, offset)[1]
+        offset += _turn.size
+        stat_struct = struct.Struct(f'<{len(self.stat_names)}d')
+        stats, alive, positions = [], [], []
+        for _ in range(self._slot_count):
+            is_alive, x, y = _slot_head.unpack_from(buffer, offset)
+            offset += _slot_head.size
+            stats.append(list(stat_struct.unpack_from(buffer, offset)))
+            offset += stat_struct.size
+            alive.append(bool(is_alive))
+            positions.append(None if x == NO_POSITION else (x, y))
+        return ReplayState(turn, stats, alive, positions), offset
+
+    def _unpack_name(self, offset: int) -> Tuple[Optional[str], int]:
+        tag = self._buffer[offset:offset + 1]
+        if tag == b'c':
+            return self._names[_u16.unpack_from(self._buffer, offset + 1)[0]], offset + 3
+        return _unpack_value(self._buffer, offset)
+
+    def _records(self, offset: int) -> Iterator[Tuple[int, Any, int]]:
+        """Yield (tag, payload, next offset) for every record from offset on"""
+        buffer = self._buffer
+        end = self._records_end
+        while offset < end:
+            tag = buffer[offset]
+            if tag == TURN:
+                yield tag, _turn.unpack_from(buffer, offset)[1], offset + _turn.size
+                offset += _turn.size
+            elif tag == DELTA:
+                _, slot, stat, value = _delta.unpack_from(buffer, offset)
+                offset += _delta.size
+                yield tag, (slot, stat, value), offset
+            elif tag == MOVE:
+                _, slot, x, y = _move.unpack_from(buffer, offset)
+                offset += _move.size
+                yield tag, (slot, None if x == NO_POSITION else (x, y)), offset
+            elif tag == REMOVE:
+                slot = _remove.unpack_from(buffer, offset)[1]
+                offset += _remove.size
+                yield tag, slot, offset
+            elif tag == EVENT:
+                _, turn, code = _event_head.unpack_from(buffer, offset)
+                actor, offset = self._unpack_name(offset + _event_head.size)
+                target, offset = self._unpack_name(offset)
+                count = buffer[offset]
+                offset += 1
+                values = []
+                for _ in range(count):
+                    value, offset = _unpack_value(buffer, offset)
+                    values.append(value)
+                yield tag, (turn, self._kinds[code], actor, target, tuple(values)), offset
+            elif tag == KEYFRAME:
+                state, offset = self._read_keyframe(offset)
+                yield tag, state, offset
+            else:
+                raise ValueError(f'Corrupt replay record tag {tag} at offset {offset}')
+
+    def state_at(self, turn: int) -> ReplayState:
+        """State at the end of `turn`, rebuilt from the nearest keyframe at or before it"""
+        start = 0
+        for index, (keyframe_turn, _) in enumerate(self.keyframes):
+            if keyframe_turn > turn:
+                break
+            start = index
+        state, offset = self._read_keyframe(self.keyframes[start][1])
+        for tag, payload, _ in self._records(offset):
+            if tag == TURN:
+                if payload > turn:
+                    break
+                state.turn = payload
+            elif tag == DELTA:
+                slot, stat, value = payload
+                state.stats[slot][stat] = value
+            elif tag == MOVE:
+                slot, position = payload
+                state.positions[slot] = position
+            elif tag == REMOVE:
+                state.alive[payload] = False
+        return state
+
+    def teams_at(self, turn: int) -> Tuple[Team, Team]:
+        """Rebuild both teams as they stood at the end of `turn`"""
+        state = self.state_at(turn)
+        team1, team2 = (Team.from_json(data) for data in self.header['teams'])
+        characters = list(team1.characters) + list(team2.characters)
+        for slot, character in enumerate(characters):
+            for index, name in enumerate(self.stat_names):
+                value = state.stats[slot][index]
+                if value == value and character.has_attribute(name):
+                    character.modify_attribute(name, value - character.get_attribute(name))
+            position = state.positions[slot]
+            character.position = Position(*position) if position is not None else None
+        for slot, character in enumerate(characters):
+            if not state.alive[slot]:
+                character.team.remove(character)
+        return team1, team2
+
+    def events(self, start_turn: int = 0, end_turn: Optional[int] = None) -> Iterator[Event]:
+        """Recorded events of turns start_turn..end_turn, with fresh sequence numbers"""
+        offset = self._records_start
+        for keyframe_turn, keyframe_offset in self.keyframes:
+            if keyframe_turn >= start_turn:
+                break
+            offset = keyframe_offset
+        sequence = 0
+        for tag, payload, _ in self._records(offset):
+            if tag != EVENT:
+                continue
+            turn, kind, actor, target, values = payload
+            if end_turn is not None and turn > end_turn:
+                return
+            if turn >= start_turn:
+                sequence += 1
+                yield Event(sequence, turn, kind, actor, target, values)
+
+    def turns(self) -> List[int]:
+        """Every turn that was captured"""
+        return [payload for tag, payload, _ in self._records(self._records_start) if tag == TURN]
+
+    def close(self):
+        self._buffer.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def record_battle(battlefield, path: str, max_turns: int = 200, keyframe_interval: int = 10) -> Team:
+    """Run an AutoBattleField battle to the end while writing its replay to path"""
+    with ReplayWriter(path, battlefield, keyframe_interval) as writer:
+        return battlefield.run_battle(max_turns=max_turns, on_turn=lambda _: writer.capture())
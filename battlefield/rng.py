@@ -0,0 +1,33 @@
+import random
+from typing import List, Optional
+
+
+def derive_seed(seed: Optional[int], *keys) -> int:
+    """Derive a 64 bit child seed from a parent seed and any hashable keys.
+
+    The derivation is stable across processes and runs, so (seed, keys) always
+    names the same stream no matter where or in which order it is created.
+    """
+    return random.Random(':'.join(str(part) for part in (seed, *keys))).getrandbits(64)
+
+
+class BattleRNG(random.Random):
+    """A seeded random stream owned by one battlefield or AI.
+
+    Replaces the module level `random` functions so interleaved or parallel
+    battles never share state, and any battle can be replayed from its seed.
+    """
+
+    def __init__(self, seed: Optional[int] = None):
+        if seed is None:
+            seed = random.SystemRandom().getrandbits(64)
+        self.initial_seed = seed
+        super().__init__(seed)
+
+    def spawn(self, *keys) -> 'BattleRNG':
+        """Independent child stream, e.g. for the AI of one side of a battle"""
+        return BattleRNG(derive_seed(self.initial_seed, *keys))
+
+    def spawn_many(self, n: int) -> List['BattleRNG']:
+        """n independent child streams, e.g. one per battle of a batch run"""
+        return [self.spawn(index) for index in range(n)]
@@ -0,0 +1,190 @@
+import json
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Iterable, List, Mapping, NamedTuple, Optional
+
+from characters import Character, CharacterTemplate, rank_bracket
+from teams import Team
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS characters (
+    name TEXT PRIMARY KEY,
+    class TEXT NOT NULL,
+    rank REAL NOT NULL,
+    bracket TEXT NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS characters_by_class ON characters (class, rank);
+CREATE INDEX IF NOT EXISTS characters_by_bracket ON characters (bracket, rank);
+CREATE INDEX IF NOT EXISTS characters_by_rank ON characters (rank);
+'''
+
+# attributes the battle engines read off every fighter
+COMBAT_STATS = ('hp', 'mp', 'armor', 'dmg', 'speed', 'stamina', 'range')
+
+
+class RosterEntry(NamedTuple):
+    """Index row of a roster character, read without decoding its definition"""
+    name: str
+    character_class: str
+    rank: float
+    bracket: str
+
+
+def normalize(data: Mapping) -> dict:
+    """A character definition in the Character.from_json schema.
+
+    Abilities may leave out mp_cost (free) and jutsu_name (the ability name),
+    like the old single-character characters.json did. Every COMBAT_STATS
+    attribute is required, a character without one would only fail mid-battle.
+    """
+    try:
+        definition = {
+            'name': data['name'],
+            'class': data['class'],
+            'attributes': [{'name': attribute['name'], 'value': attribute['value']}
+                           for attribute in data['attributes']],
+            'special_abilities': [{'name': ability['name'], 'value': ability['value'],
+                                   'mp_cost': ability.get('mp_cost', 0),
+                                   'jutsu_name': ability.get('jutsu_name', ability['name'])}
+                                  for ability in data.get('special_abilities', [])],
+        }
+    except (KeyError, TypeError) as error:
+        raise ValueError(f'Malformed character definition {data.get("name", data)!r}: missing {error}')
+    names = {attribute['name'] for attribute in definition['attributes']}
+    missing = [stat for stat in COMBAT_STATS if stat not in names]
+    if missing:
+        raise ValueError(f'Character definition {definition["name"]!r} lacks the combat stats {", ".join(missing)}')
+    return definition
+
+
+def definition_rank(data: Mapping) -> float:
+    """The rank Character would compute for a definition: its attribute values plus its ability values"""
+    return sum(attribute['value'] for attribute in data['attributes']) \
+        + sum(ability['value'] for ability in data['special_abilities'])
+
+
+class RosterStore:
+    """Catalog of character definitions backed by SQLite, indexed by name, class and rank bracket.
+
+    Only the index columns are read to search the roster; a definition is
+    decoded the first time a character is spawned and then kept as a
+    CharacterTemplate in a small LRU cache, so building teams out of a catalog
+    of thousands of characters only ever parses the ones that fight. Use a
+    file path to keep the catalog between runs, the default is an in-memory
+    database.
+    """
+
+    def __init__(self, path: str = ':memory:', cache_size: int = 1024):
+        self.path = path
+        self.cache_size = cache_size
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.executescript(_SCHEMA)
+        self._lock = threading.Lock()  # one connection shared by the web workers
+        self._templates: 'OrderedDict[str, CharacterTemplate]' = OrderedDict()
+
+    @classmethod
+    def from_json_file(cls, json_path: str, path: str = ':memory:', cache_size: int = 1024) -> 'RosterStore':
+        roster = cls(path, cache_size)
+        roster.import_json(json_path)
+        return roster
+
+    def add(self, data: Mapping) -> RosterEntry:
+        """Add a character definition, replacing any character of the same name"""
+        return self.add_many([data])[0]
+
+    def add_many(self, definitions: Iterable[Mapping]) -> List[RosterEntry]:
+        entries, rows = [], []
+        for data in definitions:
+            data = normalize(data)
+            rank = definition_rank(data)
+            entry = RosterEntry(data['name'], data['class'], rank, rank_bracket(rank))
+            entries.append(entry)
+            rows.append((*entry, json.dumps(data)))
+        with self._lock, self._db:
+            self._db.executemany('INSERT OR REPLACE INTO characters VALUES (?, ?, ?, ?, ?)', rows)
+            for entry in entries:
+                self._templates.pop(entry.name, None)
+        return entries
+
+    def import_json(self, json_path: str) -> List[RosterEntry]:
+        """Load a JSON file holding one character, a list of them or {"characters": [...]}"""
+        with open(json_path) as file:
+            data = json.load(file)
+        if isinstance(data, dict):
+            data = data['characters'] if 'characters' in data else [data]
+        return self.add_many(data)
+
+    def remove(self, name: str):
+        with self._lock, self._db:
+            self._db.execute('DELETE FROM characters WHERE name = ?', (name,))
+            self._templates.pop(name, None)
+
+    def find(self, character_class: Optional[str] = None, bracket: Optional[str] = None,
+             min_rank: Optional[float] = None, max_rank: Optional[float] = None,
+             limit: Optional[int] = None) -> List[RosterEntry]:
+        """Characters matching every given filter, strongest first"""
+        clauses, params = [], []
+        for clause, value in (('class = ?', character_class), ('bracket = ?', bracket),
+                              ('rank >= ?', min_rank), ('rank <= ?', max_rank)):
+            if value is not None:
+                clauses.append(clause)
+                params.append(value)
+        query = 'SELECT name, class, rank, bracket FROM characters'
+        if clauses:
+            query += ' WHERE ' + ' AND '.join(clauses)
+        query += ' ORDER BY rank DESC, name'
+        if limit is not None:
+            query += ' LIMIT ?'
+            params.append(limit)
+        with self._lock:
+            return [RosterEntry(*row) for row in self._db.execute(query, params)]
+
+    def entry(self, name: str) -> RosterEntry:
+        with self._lock:
+            row = self._db.execute('SELECT name, class, rank, bracket FROM characters WHERE name = ?',
+                                   (name,)).fetchone()
+        if row is None:
+            raise KeyError(f'No character named {name} in the roster')
+        return RosterEntry(*row)
+
+    def template(self, name: str) -> CharacterTemplate:
+        """The template of a character, decoded on first use"""
+        with self._lock:
+            template = self._templates.get(name)
+            if template is not None:
+                self._templates.move_to_end(name)
+                return template
+            row = self._db.execute('SELECT data FROM characters WHERE name = ?', (name,)).fetchone()
+            if row is None:
+                raise KeyError(f'No character named {name} in the roster')
+            template = self._templates[name] = CharacterTemplate.from_json(json.loads(row[0]))
+            while len(self._templates) > self.cache_size:
+                self._templates.popitem(last=False)
+            return template
+
+    def spawn(self, name: str) -> Character:
+        """A fresh, battle-ready copy of a roster character"""
+        return self.template(name).spawn()
+
+    def spawn_team(self, team_name: str, names: Iterable[str], control: str = 'ai') -> Team:
+        return Team.from_templates(team_name, [self.template(name) for name in names], control)
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    def __len__(self):
+        with self._lock:
+            return self._db.execute('SELECT COUNT(*) FROM characters').fetchone()[0]
+
+    def __contains__(self, name: str):
+        with self._lock:
+            return self._db.execute('SELECT 1 FROM characters WHERE name = ?', (name,)).fetchone() is not None
+
+    def __enter__(self) -> 'RosterStore':
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
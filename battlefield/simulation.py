@@ -0,0 +1,116 @@
+from typing import Callable, List, Mapping, NamedTuple, Optional, Tuple
+
+from teams import Team
+from characters import CharacterTemplate
+from engine import AutoBattleField
+from rng import BattleRNG, derive_seed
+from events import DEBUG, EventLog
+
+# team payloads and run settings of a process pool (tournament, sweep), shipped once to
+# every worker by init_worker, which turns each team into templates so games only spawn copies
+_worker_payloads: List[dict] = []
+_worker_teams: List[Tuple[str, List[CharacterTemplate], str]] = []
+_worker_settings = None
+
+
+class BattleResult(NamedTuple):
+    """Compact outcome of a single headless battle"""
+    winner: int  # 0 if team A won, 1 if team B won
+    turns: int
+    hp_a: int  # total hp left on team A's surviving characters
+    hp_b: int  # total hp left on team B's surviving characters
+    seed: int  # replaying this seed with the same teams reproduces the battle
+
+
+def surviving_hp(team: Team) -> int:
+    """Sum of the hp left on the characters still standing in a team"""
+    return int(sum(max(0, player.get_attribute('hp')) for player in team.characters))
+
+
+def run_headless(team_a: Team, team_b: Team, max_turns: int = 200, moves_per_turn: int = 3,
+                 seed: Optional[int] = None, events: Optional[EventLog] = None) -> BattleResult:
+    """Run a single battle without printing; nothing is recorded unless an event log is passed in"""
+    battlefield = AutoBattleField(team_a, team_b, moves_per_turn=moves_per_turn, verbose=False, seed=seed,
+                                  events=events)
+    winner = battlefield.run_battle(max_turns=max_turns)
+    return BattleResult(
+        0 if winner is team_a else 1,
+        battlefield.turn_count,
+        surviving_hp(team_a),
+        surviving_hp(team_b),
+        battlefield.seed,
+    )
+
+
+def play_game(team_a_factory: Callable[[], Team], team_b_factory: Callable[[], Team], game: int,
+              seed: Optional[int], max_turns: int = 200, moves_per_turn: int = 3) -> BattleResult:
+    """Game `game` of a series in which the teams take turns moving first.
+
+    Team A moves first in even games and team B in odd ones, so neither side
+    keeps the initiative. The result is told from team A's side either way;
+    replaying an odd game from its seed needs the teams swapped.
+    """
+    if game % 2 == 0:
+        return run_headless(team_a_factory(), team_b_factory(), max_turns, moves_per_turn, seed)
+    result = run_headless(team_b_factory(), team_a_factory(), max_turns, moves_per_turn, seed)
+    return result._replace(winner=1 - result.winner, hp_a=result.hp_b, hp_b=result.hp_a)
+
+
+def simulate_many(team_a_factory: Callable[[], Team], team_b_factory: Callable[[], Team], n: int,
+                  seed: Optional[int] = None, max_turns: int = 200, moves_per_turn: int = 3,
+                  start: int = 0, alternate: bool = False) -> List[BattleResult]:
+    """Run n headless battles between freshly built teams.
+
+    The factories are called once per battle because the engine mutates the
+    characters it fights with. Battle i runs on the i-th child stream of `seed`,
+    so the whole batch is reproducible and any single battle can be replayed
+    from the seed in its result. `start` skips the first battles, so a series
+    run in batches plays the same battles as one big batch. With `alternate`
+    the first mover alternates by battle index, see play_game.
+    """
+    base_seed = BattleRNG(seed).initial_seed
+    if alternate:
+        return [play_game(team_a_factory, team_b_factory, index, derive_seed(base_seed, index), max_turns,
+                          moves_per_turn)
+                for index in range(start, start + n)]
+    return [run_headless(team_a_factory(), team_b_factory(), max_turns, moves_per_turn, derive_seed(base_seed, index))
+            for index in range(start, start + n)]
+
+
+def init_worker(payloads: List[dict], settings=None):
+    """ProcessPoolExecutor initializer of the pools playing Team.to_json payloads"""
+    global _worker_payloads, _worker_teams, _worker_settings
+    _worker_payloads = payloads
+    _worker_teams = [(payload['name'], [CharacterTemplate.from_json(character) for character in payload['characters']],
+                      payload.get('control', 'ai'))
+                     for payload in payloads]
+    _worker_settings = settings
+
+
+def worker_payloads() -> List[dict]:
+    return _worker_payloads
+
+
+def worker_settings():
+    return _worker_settings
+
+
+def spawn_worker_team(index: int, overrides: Optional[Mapping[int, CharacterTemplate]] = None) -> Team:
+    """A fresh copy of a pool team, with the members in `overrides` (by member index) replaced"""
+    name, templates, control = _worker_teams[index]
+    if overrides:
+        templates = [overrides.get(member, template) for member, template in enumerate(templates)]
+    return Team.from_templates(name, templates, control)
+
+
+def replay_log(team_a: Team, team_b: Team, result: BattleResult, max_turns: int = 200, moves_per_turn: int = 3,
+               level: int = DEBUG) -> EventLog:
+    """Re-run a sampled battle from its seed, keeping a full-fidelity event log.
+
+    Batches run without any logging; the battles worth reading are replayed
+    through here afterwards. team_a and team_b must be fresh copies of the teams
+    the result was produced with.
+    """
+    events = EventLog(level=level, capacity=None)
+    run_headless(team_a, team_b, max_turns, moves_per_turn, result.seed, events)
+    return events
@@ -0,0 +1,112 @@
+import heapq
+from itertools import count
+from typing import Dict, Iterator, List, Tuple
+
+from characters import Character
+
+
+class StatusEffect:
+    def __init__(self, name:str, value:int, duration:int, effect_receiver:Character):
+        self.name = name
+        self.value = value
+        self.duration = duration
+        self.is_active = False
+        self.effect_receiver = effect_receiver
+        self.expires_on = 0  # last turn the effect is active, set when registered
+
+    def activate(self):
+        self.is_active = True
+
+    def deactivate(self):
+        self.is_active = False
+
+    def use(self):
+        if self.is_active:
+            self.duration -= 1
+        if self.duration == 0:
+            self.deactivate()
+
+
+class StatusEffectRegistry:
+    """Active status effects indexed by (receiver, effect name) and by effect name.
+
+    An effect registered on turn t stays active through turn t + duration.
+    Expiry times sit in a min-heap keyed by turn, so expiring only looks at the
+    effects that actually run out, and `has` is a single dict lookup.
+    Effects removed early (e.g. poison that has done all its ticks) are left in
+    the heap and skipped when they surface.
+    """
+
+    def __init__(self):
+        self._by_receiver: Dict[Tuple[int, str], Dict[int, StatusEffect]] = {}
+        self._by_name: Dict[str, Dict[int, StatusEffect]] = {}
+        self._expiry: List[Tuple[int, int, StatusEffect]] = []
+        self._ids: Dict[int, int] = {}  # id(effect) -> sequence number of registered effects
+        self._sequence = count()
+
+    def add(self, effect: StatusEffect, turn: int):
+        """Register an active effect applied on the given turn"""
+        sequence = next(self._sequence)
+        effect.expires_on = turn + effect.duration
+        self._ids[id(effect)] = sequence
+        self._by_receiver.setdefault((id(effect.effect_receiver), effect.name), {})[sequence] = effect
+        self._by_name.setdefault(effect.name, {})[sequence] = effect
+        heapq.heappush(self._expiry, (effect.expires_on, sequence, effect))
+
+    def remove(self, effect: StatusEffect):
+        """Drop an effect before it expires"""
+        sequence = self._ids.pop(id(effect), None)
+        if sequence is None:
+            return
+        key = (id(effect.effect_receiver), effect.name)
+        receiver_effects = self._by_receiver[key]
+        del receiver_effects[sequence]
+        if not receiver_effects:
+            del self._by_receiver[key]
+        del self._by_name[effect.name][sequence]
+        effect.deactivate()
+
+    def has(self, receiver: Character, name: str) -> bool:
+        """Whether the receiver is under at least one active effect of this kind"""
+        return (id(receiver), name) in self._by_receiver
+
+    def of_type(self, name: str) -> List[StatusEffect]:
+        """All active effects of one kind, oldest first"""
+        return list(self._by_name.get(name, {}).values())
+
+    def tick(self, name: str) -> Tuple[List[StatusEffect], List[StatusEffect]]:
+        """Count down every active effect of one kind in a single pass.
+
+        Returns (ticked, ran_out): all effects that ticked, oldest first, and
+        the ones among them that just used up their duration, which are
+        removed in the same pass.
+        """
+        effects = self._by_name.get(name)
+        if not effects:
+            return [], []
+        ticked = list(effects.values())
+        ran_out = []
+        for effect in ticked:
+            effect.duration -= 1
+            if effect.duration == 0:
+                ran_out.append(effect)
+        for effect in ran_out:
+            self.remove(effect)
+        return ticked, ran_out
+
+    def expire(self, turn: int) -> List[StatusEffect]:
+        """Remove and return every effect whose last active turn is before `turn`"""
+        expired = []
+        while self._expiry and self._expiry[0][0] < turn:
+            _, sequence, effect = heapq.heappop(self._expiry)
+            if self._ids.get(id(effect)) == sequence:
+                self.remove(effect)
+                expired.append(effect)
+        return expired
+
+    def __iter__(self) -> Iterator[StatusEffect]:
+        for effects in self._by_name.values():
+            yield from effects.values()
+
+    def __len__(self):
+        return len(self._ids)
@@ -0,0 +1,217 @@
+import csv
+import hashlib
+import itertools
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import Dict, Iterator, List, Mapping, Optional, Sequence, Tuple
+
+from teams import Team
+from characters import CharacterTemplate
+from simulation import init_worker, play_game, spawn_worker_team, worker_payloads, worker_settings
+from estimator import wilson_interval
+from rng import BattleRNG, derive_seed
+
+# Parameters are named "<character>.<attribute>", e.g. "Naruto Uzumaki.dmg", or
+# "<character>.<ability>.<value|mp_cost>", e.g. "Naruto Uzumaki.critical strike.value"
+# (every ability of that kind the character has). The character may be in either team, or both.
+ABILITY_FIELDS = ('value', 'mp_cost')
+RESULT_COLUMNS = ['games', 'wins_a', 'win_rate', 'win_low', 'win_high', 'mean_turns']
+
+
+def grid(space: Mapping[str, Sequence[float]]) -> List[Dict[str, float]]:
+    """Every combination of the given parameter values"""
+    names = sorted(space)
+    return [dict(zip(names, values)) for values in itertools.product(*(space[name] for name in names))]
+
+
+def latin_hypercube(ranges: Mapping[str, Tuple[float, float]], n: int, seed: Optional[int] = None,
+                    integer: bool = True) -> List[Dict[str, float]]:
+    """n variants spread over the (low, high) range of every parameter.
+
+    Each range is cut into n equal strata and every stratum is used exactly
+    once per parameter, so n samples cover each axis evenly however many
+    parameters there are. Attributes are whole numbers, hence `integer`.
+    """
+    rng = BattleRNG(seed)
+    names = sorted(ranges)
+    columns = {}
+    for name in names:
+        low, high = ranges[name]
+        strata = list(range(n))
+        rng.shuffle(strata)
+        values = [low + (high - low) * (stratum + rng.random()) / n for stratum in strata]
+        columns[name] = [int(round(value)) for value in values] if integer else values
+    return [{name: columns[name][index] for name in names} for index in range(n)]
+
+
+def variant_id(params: Mapping[str, float]) -> str:
+    """Stable name of a variant, the key resumed sweeps skip done work by"""
+    return hashlib.sha1(json.dumps(sorted(params.items())).encode()).hexdigest()[:12]
+
+
+def _split(parameter: str) -> Tuple[str, Optional[str], str]:
+    """(character, ability or None, field) of a parameter name"""
+    head, _, field = parameter.rpartition('.')
+    if field in ABILITY_FIELDS and '.' in head:
+        character, _, ability = head.rpartition('.')
+        return character, ability, field
+    return head, None, field
+
+
+def apply_variant(payloads: List[dict], params: Mapping[str, float]) -> Dict[Tuple[int, int], dict]:
+    """Character payloads changed by a variant, keyed by (team, member index); the rest stay shared.
+
+    A parameter changes every member of that name, in both teams.
+    """
+    changed: Dict[Tuple[int, int], dict] = {}
+    for parameter, value in params.items():
+        name, ability, field = _split(parameter)
+        keys = [(team, index) for team, payload in enumerate(payloads)
+                for index, character in enumerate(payload['characters']) if character['name'] == name]
+        if not keys:
+            raise ValueError(f'No character named {name} in the swept teams ({parameter})')
+        for key in keys:
+            if key not in changed:
+                changed[key] = json.loads(json.dumps(payloads[key[0]]['characters'][key[1]]))
+            character = changed[key]
+            if ability is None:
+                entries = [attribute for attribute in character['attributes'] if attribute['name'] == field]
+            else:
+                entries = [special for special in character['special_abilities'] if special['name'] == ability]
+            if not entries:
+                raise ValueError(f'{name} has nothing to sweep for {parameter}')
+            for entry in entries:
+                entry['value' if ability is None else field] = value
+    return changed
+
+
+def settings_id(payloads: List[dict], games: int, seed: int, max_turns: int, moves_per_turn: int) -> str:
+    """Stable name of everything besides the variant that decides a row, checked when a sweep is resumed"""
+    settings = [payloads, games, seed, max_turns, moves_per_turn]
+    return hashlib.sha1(json.dumps(settings, sort_keys=True).encode()).hexdigest()[:12]
+
+
+def _play_variant(job: Tuple[str, Dict[str, float]]) -> dict:
+    """Play every game of one variant, returns its result row"""
+    key, params = job
+    sweep, games, seed, max_turns, moves_per_turn = worker_settings()
+    overrides: List[Dict[int, CharacterTemplate]] = [{}, {}]
+    for (side, index), character in apply_variant(worker_payloads(), params).items():
+        overrides[side][index] = CharacterTemplate.from_json(character)
+    team_a, team_b = partial(spawn_worker_team, 0, overrides[0]), partial(spawn_worker_team, 1, overrides[1])
+    wins_a = turns = 0
+    for game in range(games):
+        result = play_game(team_a, team_b, game, derive_seed(seed, key, game), max_turns, moves_per_turn)
+        wins_a += result.winner == 0
+        turns += result.turns
+    low, high = wilson_interval(wins_a, games)
+    return {'variant': key, 'sweep': sweep, **params, 'games': games, 'wins_a': wins_a, 'win_rate': wins_a / games,
+            'win_low': low, 'win_high': high, 'mean_turns': turns / games}
+
+
+def _done_variants(checkpoint: str, columns: List[str], sweep: str) -> Iterator[dict]:
+    with open(checkpoint, newline='') as file:
+        reader = csv.DictReader(file)
+        if reader.fieldnames != columns:
+            raise ValueError(f'{checkpoint} holds a different sweep ({reader.fieldnames}), move it away to restart')
+        for row in reader:
+            if row['sweep'] != sweep:
+                raise ValueError(f'{checkpoint} was played with other teams, games, seed or turn settings, '
+                                 f'move it away to restart')
+            yield row
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise ImportError('Writing Parquet needs pyarrow, write a .csv result table instead')
+    return pyarrow
+
+
+def write_parquet(rows: List[dict], path: str):
+    pyarrow = _pyarrow()
+    columns = list(rows[0]) if rows else []
+    pyarrow.parquet.write_table(pyarrow.table({column: [row[column] for row in rows] for column in columns}), path)
+
+
+def run_sweep(team_a: Team, team_b: Team, variants: List[Dict[str, float]], output: str, games: int = 100,
+              seed: int = 0, workers: Optional[int] = None, max_turns: int = 200,
+              moves_per_turn: int = 3) -> List[dict]:
+    """Play team A against team B under every variant and write a table of win rates, one row per variant.
+
+    Variants (see grid and latin_hypercube) override parameters of either
+    team; each is played `games` times across a process pool, seeded from
+    (seed, variant, game) alone. Workers build the base teams' templates once
+    and only rebuild the characters a variant changes.
+
+    Rows are appended to a CSV checkpoint as variants finish: `output` itself
+    when it is a .csv, `output + '.partial.csv'` when it is a .parquet file
+    (written once the sweep is complete, needs pyarrow). Running the same
+    sweep again skips the variants already in the checkpoint, so an
+    interrupted sweep picks up where it stopped; every row carries a `sweep`
+    hash of the teams and settings, and a checkpoint of a different sweep is
+    refused rather than mixed in. Returns every row, in variant order.
+    """
+    if games < 1:
+        raise ValueError(f'games must be at least 1, got {games}')
+    payloads = [team_a.to_json(), team_b.to_json()]
+    sweep = settings_id(payloads, games, seed, max_turns, moves_per_turn)
+    jobs = {}
+    for params in variants:
+        apply_variant(payloads, params)  # fail on a bad parameter before starting any worker
+        jobs.setdefault(variant_id(params), params)
+    names = sorted({name for params in variants for name in params})
+    columns = ['variant', 'sweep'] + names + RESULT_COLUMNS
+
+    parquet = output.endswith('.parquet')
+    if parquet:
+        _pyarrow()  # before playing anything
+    checkpoint = output + '.partial.csv' if parquet else output
+    rows = []
+    if os.path.exists(checkpoint) and os.path.getsize(checkpoint) > 0:
+        rows = [row for row in _done_variants(checkpoint, columns, sweep) if row['variant'] in jobs]
+        for row in rows:
+            del jobs[row['variant']]
+    else:
+        with open(checkpoint, 'w', newline='') as file:
+            csv.DictWriter(file, columns).writeheader()
+
+    if jobs:
+        workers = workers or os.cpu_count() or 1
+        with open(checkpoint, 'a', newline='') as file, \
+                ProcessPoolExecutor(max_workers=workers, initializer=init_worker,
+                                    initargs=(payloads, (sweep, games, seed, max_turns, moves_per_turn))) as executor:
+            writer = csv.DictWriter(file, columns, restval='')
+            for row in executor.map(_play_variant, jobs.items()):
+                writer.writerow(row)
+                file.flush()
+                rows.append(row)
+
+    order = {key: index for index, key in enumerate(variant_id(params) for params in variants)}
+    rows = sorted((_typed(row, names) for row in rows), key=lambda row: order[row['variant']])
+    if parquet:
+        write_parquet(rows, output)
+        os.remove(checkpoint)
+    return rows
+
+
+def _typed(row: dict, names: List[str]) -> dict:
+    """A result row with numbers as numbers, read the way the CSV checkpoint stores them.
+
+    Rows played in this run and rows read back from the checkpoint (which
+    hold strings) go through the same text, so a resumed sweep returns the
+    same values and types as an uninterrupted one.
+    """
+    typed = {'variant': row['variant'], 'sweep': row['sweep']}
+    for column in names + RESULT_COLUMNS:
+        value = row.get(column)
+        text = '' if value is None else str(value)
+        value = float(text) if text else None
+        if value is not None and column not in RESULT_COLUMNS[2:] and value.is_integer():
+            value = int(value)
+        typed[column] = value
+    return typed
@@ -1,5 +1,12 @@
 from typing import List
-from characters import Character
+from characters import RATED_ATTRIBUTES, Character, CharacterTemplate
+from indexed_heap import IndexedHeap
+
+
+def vulnerability(character:Character) -> float:
+    """Lower means easier to finish off, used for target selection"""
+    return character.get_attribute('hp') + character.get_attribute('armor') * 0.5
+
 
 class Team:
     def __init__(self, name, control='ai',):
@@ -7,27 +14,105 @@ class Team:
         self.rating = 0
         self.characters = []
         self.control = control
+        # members keyed by vulnerability, updated whenever their hp/armor changes
+        self._targets = IndexedHeap()
+        # bumped on every member move / attribute change, so cached analyses know when they are stale;
+        # membership and order changes count as moves
+        self.positions_version = 0
+        self.stats_version = 0
 
     def _populate_team(self, characters:List[Character]):
         self.characters = characters
         self.size = len(characters)
+        for character in characters:
+            character.team = self
+        self.compute_rating()
+        self._index_targets()
+        self.positions_version += 1
+
+    def _index_targets(self):
+        self._targets.clear()
+        for order, character in enumerate(self.characters):
+            self._targets.push(id(character), character, vulnerability(character), order)
 
     def compute_rating(self):
+        """Recompute the rating from scratch, it is otherwise maintained incrementally.
+
+        The rating is the summed rank of the members still standing; during a
+        battle only hp and armor changes (RATED_ATTRIBUTES) move it.
+        """
         self.rating = sum(i.rank for i in self.characters)
         return self.rating
 
+    def _on_rank_change(self, character:Character, delta):
+        """Called by a member whenever its rank changes"""
+        self.rating += delta
+
+    def _on_attribute_change(self, character:Character, attr_name:str, delta):
+        """Called by a member whenever one of its attributes changes"""
+        self.stats_version += 1
+        if attr_name in RATED_ATTRIBUTES:
+            self.rating += delta
+            self._targets.update(id(character), vulnerability(character))
+
+    def _on_move(self, character:Character):
+        """Called by a member whenever its position changes"""
+        self.positions_version += 1
+
+    def most_vulnerable(self) -> Character:
+        """The member with the lowest hp + 0.5 * armor, first in team order on ties"""
+        return self._targets.peek()
+
+    def remove(self, character:Character):
+        """Take a (defeated) character out of the team and its rating"""
+        for index, member in enumerate(self.characters):
+            if member is character:
+                del self.characters[index]
+                self._targets.remove(id(character))
+                self.rating -= character.rank
+                self.positions_version += 1
+                character.team = None
+                return
+
     def assemble(self, characters:list):
         self._populate_team(characters)
 
+    def to_json(self):
+        return {
+            'name': self.name,
+            'control': self.control,
+            'characters': [character.to_json() for character in self.characters],
+        }
+
+    @classmethod
+    def from_json(cls, data):
+        """Build a fresh, battle-ready team from a to_json payload"""
+        team = cls(data['name'], data.get('control', 'ai'))
+        team.assemble([Character.from_json(character) for character in data['characters']])
+        return team
+
+    @classmethod
+    def from_templates(cls, name, templates:List[CharacterTemplate], control='ai'):
+        """A fresh, battle-ready team spawned from character templates"""
+        team = cls(name, control)
+        team.assemble([template.spawn() for template in templates])
+        return team
+
+    def templates(self) -> List[CharacterTemplate]:
+        """Templates of the members' current stats, to spawn copies of this team from"""
+        return [CharacterTemplate.from_json(character.to_json()) for character in self.characters]
+
     def count(self):
         return len(self.characters)
     
     def __iter__(self):
         return iter(self.characters)
     
-    def shuffle(self):
+    def shuffle(self, rng=None):
         import random
-        random.shuffle(self.characters)
+        (rng or random).shuffle(self.characters)
+        self._index_targets()
+        self.positions_version += 1
 
     def __str__(self):
         return self.name
\ No newline at end of file
@@ -0,0 +1,39 @@
+import os
+
+from battle_bot import BattleAI
+from characters import Position
+from roster import RosterStore
+
+ROSTER = RosterStore.from_json_file(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'characters.json'))
+
+
+def _place(team, cells):
+    for character, (x, y) in zip(team.characters, cells):
+        character.position = Position(x, y)
+
+
+def test_target_choice_follows_moved_enemies():
+    allies = ROSTER.spawn_team('Alpha', ['Naruto Uzumaki'])
+    enemies = ROSTER.spawn_team('Bravo', ['Sasuke Uchiha', 'Kakashi Hatake'])
+    _place(allies, [(1, 5)])
+    _place(enemies, [(3, 5), (18, 5)])
+    character = allies.characters[0]
+    ai = BattleAI()
+    ai.choose_move(character, allies.characters, enemies.characters, (20, 10))
+
+    sasuke, kakashi = enemies.characters
+    sasuke.position, kakashi.position = Position(18, 5), Position(3, 5)
+    expected = BattleAI().choose_attack_target(character, enemies.characters)
+    assert ai.choose_attack_target(character, enemies.characters) is expected
+    assert expected is kakashi
+
+
+def test_wounds_are_measured_against_starting_hp():
+    allies = ROSTER.spawn_team('Alpha', ['Naruto Uzumaki', 'Madara Uchiha'])
+    naruto, madara = allies.characters
+    ai = BattleAI()
+    assert ai._find_critical_ally(allies.characters) is None
+    madara.modify_attribute('hp', -madara.get_attribute('hp') * 0.8)
+    assert ai._find_critical_ally(allies.characters) is madara
+    naruto.modify_attribute('hp', -naruto.get_attribute('hp'))
+    assert ai._find_critical_ally(allies.characters) is naruto
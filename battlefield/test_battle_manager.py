@@ -0,0 +1,53 @@
+from itertools import count
+
+from battle_manager import BattleManager
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _manager(**options):
+    clock = Clock()
+    battlefields = count()
+    manager = BattleManager(lambda: next(battlefields), clock=clock, **options)
+    evicted = []
+    manager.on_evict = lambda session: evicted.append(session.battle_id)
+    return manager, clock, evicted
+
+
+def test_least_recently_used_battle_is_evicted_over_capacity():
+    manager, clock, evicted = _manager(max_battles=2)
+    manager.create('a')
+    manager.create('b')
+    assert manager.get('a').battlefield == 0  # 'a' is now the most recently used
+    manager.create('c')
+    assert evicted == ['b'] and 'b' not in manager and len(manager) == 2
+    assert [session.battle_id for session in manager] == ['a', 'c']
+
+
+def test_idle_battles_expire_after_the_ttl():
+    manager, clock, evicted = _manager(idle_ttl=60)
+    manager.create('a')
+    manager.create('b')
+    clock.now = 50
+    manager.get('b')
+    clock.now = 100
+    assert manager.get('a') is None and evicted == ['a']
+    assert manager.get('b') is not None
+    clock.now = 200
+    manager.evict_idle()
+    assert evicted == ['a', 'b'] and len(manager) == 0
+
+
+def test_replacing_a_battle_notifies_the_old_one():
+    manager, clock, evicted = _manager()
+    first = manager.create('a')
+    second = manager.get_or_create('a')
+    assert second is first
+    third = manager.create('a')
+    assert third is not first and third.battlefield == 1 and evicted == ['a']
@@ -0,0 +1,40 @@
+import random
+
+from indexed_heap import IndexedHeap
+
+
+def test_update_and_remove_keep_the_minimum():
+    heap = IndexedHeap()
+    for order, (key, priority) in enumerate([('a', 5), ('b', 3), ('c', 8), ('d', 3)]):
+        heap.push(key, key.upper(), priority, order)
+    assert heap.peek() == 'B'  # ties go to the lower order
+
+    heap.update('c', 1)
+    assert heap.peek() == 'C'
+    heap.update('c', 9)
+    assert heap.peek() == 'B'
+    heap.remove('b')
+    assert heap.peek() == 'D' and 'b' not in heap and len(heap) == 3
+    heap.remove('b')  # unknown keys are ignored
+    heap.update('b', 0)
+    assert heap.peek() == 'D'
+
+
+def test_matches_a_sorted_reference_under_random_operations():
+    rng = random.Random(7)
+    heap, reference = IndexedHeap(), {}
+    for step in range(2000):
+        key = rng.randrange(50)
+        operation = rng.random()
+        if key not in reference:
+            reference[key] = (rng.randrange(100), step)
+            heap.push(key, key, *reference[key])
+        elif operation < 0.5:
+            reference[key] = (rng.randrange(100), reference[key][1])
+            heap.update(key, reference[key][0])
+        else:
+            del reference[key]
+            heap.remove(key)
+        assert len(heap) == len(reference)
+        if reference:
+            assert heap.peek() == min(reference, key=reference.get)
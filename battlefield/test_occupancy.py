@@ -0,0 +1,54 @@
+import os
+
+import pytest
+
+from characters import Position
+from manual_battle import ManualBattleField
+from occupancy import OccupancyGrid
+from roster import RosterStore
+
+ROSTER = RosterStore.from_json_file(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'characters.json'))
+
+
+def _placed(grid, name, x, y):
+    character = ROSTER.spawn(name)
+    character.position = Position(x, y)
+    grid.place(character)
+    return character
+
+
+def test_moves_follow_the_character_and_collisions_are_refused():
+    grid = OccupancyGrid(10, 5)
+    naruto = _placed(grid, 'Naruto Uzumaki', 1, 1)
+    sasuke = _placed(grid, 'Sasuke Uchiha', 3, 1)
+
+    naruto.position = Position(2, 2)
+    assert grid.at(2, 2) is naruto and grid.at(1, 1) is None and grid.is_free(1, 1)
+    with pytest.raises(ValueError):
+        naruto.position = Position(3, 1)
+    # the failed move leaves both the grid and the character where they were
+    assert grid.at(2, 2) is naruto and grid.at(3, 1) is sasuke and naruto.position == Position(2, 2)
+    with pytest.raises(ValueError):
+        _placed(grid, 'Kakashi Hatake', 3, 1)
+
+    grid.remove(sasuke)
+    assert sasuke.grid is None and grid.is_free(3, 1) and len(grid) == 1
+    assert grid.within(Position(2, 2), 1) == [naruto]
+
+
+def test_nearest_free_cell():
+    grid = OccupancyGrid(3, 3)
+    assert grid.nearest_free(1, 1) == (1, 1)
+    _placed(grid, 'Naruto Uzumaki', 1, 1)
+    x, y = grid.nearest_free(1, 1)
+    assert abs(x - 1) + abs(y - 1) == 1
+
+
+def test_teams_taller_than_the_grid_and_reused_teams_are_placed():
+    humans = ROSTER.spawn_team('Alpha', ['Naruto Uzumaki'] * 12)
+    ais = ROSTER.spawn_team('Bravo', ['Madara Uchiha'] * 12)
+    for _ in range(2):
+        battlefield = ManualBattleField(humans, ais, grid_size=(20, 10), seed=1)
+        cells = {character.position.get() for character in humans.characters + ais.characters}
+        assert len(cells) == 24 and len(battlefield.grid) == 24
+        assert all(character.grid is battlefield.grid for character in humans.characters + ais.characters)
@@ -0,0 +1,49 @@
+from pathfinding import UNREACHABLE, FlowField, PathPlanner, astar, chebyshev
+
+GRID = (10, 8)
+# a wall across x = 5 with a gap at y = 7
+WALL = frozenset((5, y) for y in range(7))
+
+
+def _is_walk(start, path, blocked):
+    cells = [start] + path
+    return all(chebyshev(a, b) == 1 for a, b in zip(cells, cells[1:])) and not blocked.intersection(path)
+
+
+def test_flow_field_distances():
+    field = FlowField((2, 3), GRID, frozenset())
+    assert all(field.distance((x, y)) == chebyshev((x, y), (2, 3)) for x in range(10) for y in range(8))
+
+    walled = FlowField((8, 0), GRID, WALL)
+    assert walled.distance((2, 0)) == 14  # down to the gap at (5, 7) and back up
+    assert walled.distance((5, 3)) != UNREACHABLE  # blocked cells still get a distance
+
+
+def test_walk_and_astar_go_around_walls():
+    field = FlowField((8, 0), GRID, WALL)
+    path = field.walk((2, 0), 20, WALL)
+    assert _is_walk((2, 0), path, WALL) and len(path) == 13 and chebyshev(path[-1], (8, 0)) == 1
+
+    route = astar((2, 0), (8, 0), GRID, WALL)
+    assert _is_walk((2, 0), route, WALL) and len(route) == len(path)
+    assert astar((7, 0), (8, 0), GRID, WALL) == []  # already in reach
+
+
+def test_astar_without_a_route():
+    enclosed = WALL | {(5, 7)}
+    assert astar((2, 0), (8, 0), GRID, enclosed) == []
+
+
+def test_planner_reuses_fields_and_detours_around_new_blockers():
+    planner = PathPlanner()
+    planner.begin_turn(1)
+    first = planner.path((0, 0), (9, 0), 3, GRID, frozenset())
+    assert first == [(1, 0), (2, 0), (3, 0)]
+    assert planner.field((9, 0), GRID, frozenset()) is planner.field((9, 0), GRID, WALL)
+
+    # the shared field was built on an open grid, the wall makes the walk stop short
+    path = planner.path((4, 1), (9, 0), 3, GRID, WALL)
+    assert _is_walk((4, 1), path, WALL) and path == astar((4, 1), (9, 0), GRID, WALL)[:3]
+
+    planner.begin_turn(2)
+    assert planner.field((9, 0), GRID, WALL) is not planner.field((9, 3), GRID, WALL)
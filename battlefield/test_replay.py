@@ -0,0 +1,43 @@
+import os
+
+import pytest
+
+from engine import AutoBattleField
+from events import EventLog, render
+from replay import ReplayReader, ReplayWriter
+from roster import RosterStore
+
+ROSTER = RosterStore.from_json_file(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'characters.json'))
+
+
+def _state(team):
+    """Everything a replay restores about a team's standing members"""
+    return {character.name: ([(attribute.name, attribute.value) for attribute in character.attributes],
+                             character.position.get() if character.position is not None else None)
+            for character in team.characters}
+
+
+@pytest.mark.parametrize('keyframe_interval', [1, 4])
+def test_replay_round_trip(tmp_path, keyframe_interval):
+    team1 = ROSTER.spawn_team('Alpha', ['Naruto Uzumaki', 'Madara Uchiha'])
+    team2 = ROSTER.spawn_team('Bravo', ['Sasuke Uchiha', 'Kakashi Hatake'])
+    battlefield = AutoBattleField(team1, team2, verbose=False, seed=11, events=EventLog(capacity=None))
+    path = str(tmp_path / 'battle.rpl')
+    live = {}
+
+    with ReplayWriter(path, battlefield, keyframe_interval) as writer:
+        def on_turn(field):
+            writer.capture()
+            live[field.turn_count] = (_state(field.team1), _state(field.team2))
+        battlefield.run_battle(max_turns=200, on_turn=on_turn)
+
+    with ReplayReader(path) as reader:
+        assert reader.turns() == sorted(live)
+        for turn, (state1, state2) in live.items():
+            replayed1, replayed2 = reader.teams_at(turn)
+            assert _state(replayed1) == state1, turn
+            assert _state(replayed2) == state2, turn
+            recorded = [(event.turn, render(event)) for event in reader.events(turn, turn)]
+            assert recorded == [(event.turn, render(event)) for event in battlefield.events if event.turn == turn]
+        assert [(event.turn, event.kind, render(event)) for event in reader.events()] == \
+            [(event.turn, event.kind, render(event)) for event in battlefield.events]
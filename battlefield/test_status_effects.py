@@ -0,0 +1,41 @@
+import os
+
+from roster import RosterStore
+from status_effects import StatusEffect, StatusEffectRegistry
+
+ROSTER = RosterStore.from_json_file(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'characters.json'))
+
+
+def test_effects_expire_after_their_last_active_turn():
+    naruto, sasuke = ROSTER.spawn('Naruto Uzumaki'), ROSTER.spawn('Sasuke Uchiha')
+    registry = StatusEffectRegistry()
+    stun = StatusEffect('stun', 0, 1, naruto)
+    evasion = StatusEffect('evasion', 200, 2, sasuke)
+    registry.add(stun, 3)
+    registry.add(evasion, 3)
+
+    assert registry.expire(4) == []
+    assert registry.has(naruto, 'stun') and registry.has(sasuke, 'evasion')
+    assert registry.expire(5) == [stun]
+    assert not registry.has(naruto, 'stun') and registry.has(sasuke, 'evasion')
+    assert registry.expire(6) == [evasion]
+    assert len(registry) == 0
+
+
+def test_tick_counts_down_and_removes_spent_effects():
+    naruto = ROSTER.spawn('Naruto Uzumaki')
+    registry = StatusEffectRegistry()
+    first, second = StatusEffect('poison', 5, 1, naruto), StatusEffect('poison', 5, 3, naruto)
+    registry.add(first, 1)
+    registry.add(second, 1)
+
+    ticked, ran_out = registry.tick('poison')
+    assert ticked == [first, second] and ran_out == [first]
+    assert registry.of_type('poison') == [second] and registry.has(naruto, 'poison')
+    # the spent effect is gone, its stale expiry entry is skipped
+    assert registry.expire(3) == []
+    registry.tick('poison')
+    ticked, ran_out = registry.tick('poison')
+    assert ticked == ran_out == [second]
+    assert not registry.has(naruto, 'poison') and len(registry) == 0
+    assert registry.tick('poison') == ([], [])
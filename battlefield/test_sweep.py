@@ -0,0 +1,34 @@
+import os
+
+import pytest
+
+from roster import RosterStore
+from sweep import grid, run_sweep
+
+ROSTER = RosterStore.from_json_file(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'characters.json'))
+
+
+def _teams():
+    return (ROSTER.spawn_team('Alpha', ['Naruto Uzumaki', 'Kakashi Hatake']),
+            ROSTER.spawn_team('Bravo', ['Naruto Uzumaki', 'Madara Uchiha']))
+
+
+def test_resumed_sweep_returns_the_same_rows(tmp_path):
+    variants = grid({'Naruto Uzumaki.dmg': [300.0, 450.5], 'Kakashi Hatake.heal self.value': [100, 200]})
+    full = run_sweep(*_teams(), variants, str(tmp_path / 'full.csv'), games=4, seed=1, workers=1)
+
+    partial = str(tmp_path / 'partial.csv')
+    run_sweep(*_teams(), variants[:2], partial, games=4, seed=1, workers=1)
+    resumed = run_sweep(*_teams(), variants, partial, games=4, seed=1, workers=1)
+
+    assert resumed == full
+    assert [[type(value) for value in row.values()] for row in resumed] == \
+        [[type(value) for value in row.values()] for row in full]
+
+
+def test_checkpoint_of_other_settings_is_refused(tmp_path):
+    variants = grid({'Naruto Uzumaki.dmg': [300, 400]})
+    output = str(tmp_path / 'sweep.csv')
+    run_sweep(*_teams(), variants[:1], output, games=2, seed=1, workers=1)
+    with pytest.raises(ValueError):
+        run_sweep(*_teams(), variants, output, games=2, seed=2, workers=1)
@@ -0,0 +1,32 @@
+import math
+import os
+
+import numpy as np
+import pytest
+
+from roster import RosterStore
+from simulation import simulate_many
+from vector_engine import simulate_vectorized
+
+ROSTER = RosterStore.from_json_file(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'characters.json'))
+
+
+@pytest.mark.parametrize('team_a, team_b', [
+    (['Naruto Uzumaki'], ['Madara Uchiha']),
+    (['Kakashi Hatake', 'Sasuke Uchiha'], ['Madara Uchiha']),
+])
+def test_matches_object_engine_statistics(team_a, team_b):
+    """Same battles, different random streams: win rates and lengths agree within 4 standard errors"""
+    objects = simulate_many(lambda: ROSTER.spawn_team('A', team_a), lambda: ROSTER.spawn_team('B', team_b),
+                            1000, seed=5)
+    vectors = simulate_vectorized(ROSTER.spawn_team('A', team_a), ROSTER.spawn_team('B', team_b), 20000, seed=5)
+
+    wins = np.array([result.winner == 0 for result in objects])
+    p = wins.mean()
+    q = vectors.win_rate()
+    error = math.sqrt(p * (1 - p) / len(wins) + q * (1 - q) / len(vectors.turns))
+    assert abs(p - q) <= 4 * error
+
+    turns = np.array([result.turns for result in objects], dtype=np.float64)
+    error = math.sqrt(turns.var(ddof=1) / len(turns) + vectors.turns.var(ddof=1) / len(vectors.turns))
+    assert abs(turns.mean() - vectors.turns.mean()) <= 4 * error
@@ -0,0 +1,84 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import Dict, List, Optional, Tuple
+
+from teams import Team
+from simulation import init_worker, play_game, spawn_worker_team, worker_settings
+from rng import BattleRNG, derive_seed
+
+
+def _play_games(job: Tuple[int, int, List[int], int, int]) -> Tuple[int, int, int, int]:
+    """Play every game of one matchup chunk, returns (team_a, team_b, wins_a, wins_b)"""
+    team_a, team_b, games, max_turns, moves_per_turn = job
+    wins_a = wins_b = 0
+    for game in games:
+        # depends only on the job, never on which worker runs it
+        seed = derive_seed(worker_settings(), team_a, team_b, game)
+        result = play_game(partial(spawn_worker_team, team_a), partial(spawn_worker_team, team_b),
+                           game, seed, max_turns, moves_per_turn)
+        if result.winner == 0:
+            wins_a += 1
+        else:
+            wins_b += 1
+    return team_a, team_b, wins_a, wins_b
+
+
+class TournamentResult:
+    def __init__(self, names: List[str], wins: List[List[int]], games: List[List[int]], seed: Optional[int] = None):
+        self.names = names
+        self.wins = wins  # wins[i][j]: games team i won against team j
+        self.games = games
+        self.seed = seed  # replaying the tournament with this seed reproduces it
+
+    def win_rates(self) -> List[List[float]]:
+        """Matrix of win rates, win_rates[i][j] is how often team i beat team j"""
+        size = len(self.names)
+        return [[self.wins[i][j] / self.games[i][j] if self.games[i][j] else 0.0 for j in range(size)]
+                for i in range(size)]
+
+    def rankings(self) -> List[Tuple[str, float]]:
+        """Teams ordered by overall win rate across every matchup"""
+        totals = []
+        for i, name in enumerate(self.names):
+            played = sum(self.games[i])
+            totals.append((name, sum(self.wins[i]) / played if played else 0.0))
+        return sorted(totals, key=lambda item: item[1], reverse=True)
+
+    def to_dict(self) -> Dict[str, Dict[str, float]]:
+        rates = self.win_rates()
+        return {self.names[i]: {self.names[j]: rates[i][j] for j in range(len(self.names)) if i != j}
+                for i in range(len(self.names))}
+
+
+def run_tournament(teams: List[Team], games_per_pair: int = 100, seed: Optional[int] = None,
+                   workers: Optional[int] = None, chunk_size: int = 25, max_turns: int = 200,
+                   moves_per_turn: int = 3) -> TournamentResult:
+    """Play every pair of teams against each other games_per_pair times across a process pool.
+
+    Teams travel to the workers as Character.to_json payloads, so the teams passed
+    in are never mutated. Each game is seeded from (seed, pair, game) alone, which
+    makes the result identical for any worker count or chunk size. Without a
+    seed a fresh one is drawn, it is kept on the result.
+    """
+    seed = BattleRNG(seed).initial_seed
+    payloads = [team.to_json() for team in teams]
+    size = len(teams)
+    jobs = []
+    for a in range(size):
+        for b in range(a + 1, size):
+            for start in range(0, games_per_pair, chunk_size):
+                games = list(range(start, min(start + chunk_size, games_per_pair)))
+                jobs.append((a, b, games, max_turns, moves_per_turn))
+
+    wins = [[0] * size for _ in range(size)]
+    games = [[0] * size for _ in range(size)]
+    workers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker,
+                             initargs=(payloads, seed)) as executor:
+        for a, b, wins_a, wins_b in executor.map(_play_games, jobs):
+            wins[a][b] += wins_a
+            wins[b][a] += wins_b
+            games[a][b] += wins_a + wins_b
+            games[b][a] += wins_a + wins_b
+    return TournamentResult([team.name for team in teams], wins, games, seed)
@@ -0,0 +1,243 @@
+from typing import NamedTuple, Optional
+
+import numpy as np
+
+from teams import Team
+
+STATS = ('hp', 'mp', 'armor', 'dmg', 'speed', 'stamina')
+
+# special abilities the kernel knows how to apply, by the code stored in its ability tables
+ABILITY_CODES = {
+    'evasion': 0,
+    'critical strike': 1,
+    'poison': 2,
+    'stun': 3,
+    'heal self': 4,
+    'heal others': 5,
+    'buff': 6,
+}
+POISON_DURATION = 3
+STATUS_DURATION = 1  # evasion and stun stay active through the turn after they are cast
+SPECIAL_EVERY = 3  # specials are cast on turns that are a multiple of this, like AutoBattleField
+
+
+class VectorBattleResults(NamedTuple):
+    """Outcome of a batch of vectorized battles, one array entry per battle"""
+    winner: np.ndarray  # 0 if team A won, 1 if team B won
+    turns: np.ndarray
+    hp_a: np.ndarray
+    hp_b: np.ndarray
+
+    def win_rate(self) -> float:
+        """Share of the battles won by team A"""
+        return float(np.mean(self.winner == 0))
+
+
+class VectorBattleField:
+    """Runs many AutoBattleField battles between the same two teams at once.
+
+    Both teams are held as struct-of-arrays state of shape (battles, 2, slots)
+    and every battle advances in lockstep: the same turn, the same move, with
+    the attack, target choice and special ability rules of AutoBattleField
+    applied to all of them by array operations. Battles draw from one NumPy
+    generator, so they are statistically equivalent to, not move-for-move
+    copies of, object engine battles.
+    """
+
+    def __init__(self, team1: Team, team2: Team, battles: int, moves_per_turn: int = 3,
+                 seed: Optional[int] = None):
+        teams = (team1, team2)
+        slots = max(team1.count(), team2.count())
+        max_abilities = max([len(player.special_abilities) for team in teams for player in team.characters] + [1])
+        self.battles = battles
+        self.moves_per_turn = moves_per_turn
+        self.turn_count = 1
+        self.rng = np.random.default_rng(seed)
+        self._battle_index = np.arange(battles)
+
+        base = np.zeros((len(STATS), 2, slots))
+        alive = np.zeros((2, slots), dtype=bool)
+        self.rank = np.zeros((2, slots))
+        self.ability_count = np.zeros((2, slots), dtype=np.int64)
+        self.ability_codes = np.zeros((2, slots, max_abilities), dtype=np.int64)
+        self.ability_costs = np.zeros((2, slots, max_abilities))
+        self.ability_values = np.zeros((2, slots, max_abilities))
+        for side, team in enumerate(teams):
+            for slot, player in enumerate(team.characters):
+                for index, stat in enumerate(STATS):
+                    base[index, side, slot] = player.get_attribute(stat)
+                alive[side, slot] = True
+                self.rank[side, slot] = player.rank
+                self.ability_count[side, slot] = len(player.special_abilities)
+                for k, ability in enumerate(player.special_abilities):
+                    if ability.name not in ABILITY_CODES:
+                        raise ValueError(f"Special ability '{ability.name}' is not implemented.")
+                    code = ABILITY_CODES[ability.name]
+                    self.ability_codes[side, slot, k] = code
+                    self.ability_costs[side, slot, k] = ability.mp_cost
+                    self.ability_values[side, slot, k] = ability.value
+
+        # rank moves with hp and armor changes (RATED_ATTRIBUTES), so live rank = this offset + hp + armor
+        self.rank_offset = self.rank - base[STATS.index('hp')] - base[STATS.index('armor')]
+
+        shape = (battles, 2, slots)
+        self.hp, self.mp, self.armor, self.dmg, self.speed, self.stamina = (
+            np.broadcast_to(values, shape).copy() for values in base)
+        self.alive = np.broadcast_to(alive, shape).copy()
+        # last turn an evasion/stun effect is active, 0 when there is none
+        self.evading_until = np.zeros(shape, dtype=np.int64)
+        self.stunned_until = np.zeros(shape, dtype=np.int64)
+        # one slot per poison that can be ticking on a character at once: every move of a special turn
+        # may land one, and they stay for POISON_DURATION turns, so a new cast never displaces a live one
+        has_poison = bool((self.ability_codes == ABILITY_CODES['poison']).any())  # padding is never poison
+        stacks = moves_per_turn * -(-POISON_DURATION // SPECIAL_EVERY) if has_poison else 1
+        self.poison_value = np.zeros(shape + (stacks,))
+        self.poison_left = np.zeros(shape + (stacks,), dtype=np.int64)
+        self.running = np.ones(battles, dtype=bool)
+        self.winner = np.full(battles, -1, dtype=np.int64)
+        self.turns = np.zeros(battles, dtype=np.int64)
+
+    def effective_speed(self, speed: np.ndarray, stamina: np.ndarray, max_stamina: int = 1000) -> np.ndarray:
+        return speed * (stamina / max_stamina)
+
+    def calculate_hp_armor_damage(self, armor: np.ndarray, damage: np.ndarray):
+        """returns the actual damage and the armor damage of the attack, per battle"""
+        actual_dmg = damage * 100 / (100 + armor)
+        armor_dmg = (1 - actual_dmg / damage) * armor * 0.3
+        return actual_dmg, armor_dmg
+
+    def _move(self, side: int):
+        """One move of the active side in every running battle"""
+        b = self._battle_index
+        enemy = 1 - side
+        own_alive = self.alive[:, side]
+        enemy_alive = self.alive[:, enemy]
+        acting = self.running & own_alive.any(1) & enemy_alive.any(1)
+        if not acting.any():
+            return
+        # uniform choice among the living, like rng.choice(active_team.characters)
+        attacker = np.where(own_alive, self.rng.random(own_alive.shape), -1.0).argmax(1)
+        # pick_opponent: lowest hp + 0.5 * armor, first in team order on ties
+        vulnerability = np.where(enemy_alive, self.hp[:, enemy] + 0.5 * self.armor[:, enemy], np.inf)
+        target = vulnerability.argmin(1)
+
+        if self.turn_count % SPECIAL_EVERY == 0:
+            self._special(side, attacker, target, acting)
+        else:
+            self._attack(side, attacker, target, acting)
+
+        # check_player_status on the opponent
+        dead = acting & (self.hp[b, enemy, target] <= 0)
+        self.alive[b[dead], enemy, target[dead]] = False
+
+    def _attack(self, side: int, attacker: np.ndarray, target: np.ndarray, acting: np.ndarray):
+        b = self._battle_index
+        enemy = 1 - side
+        stunned = self.stunned_until[b, side, attacker] >= self.turn_count
+        evading = self.evading_until[b, enemy, target] >= self.turn_count
+        hits = acting & ~stunned & ~evading
+        hp_damage, armor_damage = self.calculate_hp_armor_damage(self.armor[b, enemy, target],
+                                                                 self.dmg[b, side, attacker])
+        attacker_speed = self.effective_speed(self.speed[b, side, attacker], self.stamina[b, side, attacker])
+        target_speed = self.effective_speed(self.speed[b, enemy, target], self.stamina[b, enemy, target])
+        damage_factor = np.where(target_speed == 0, 1.0,
+                                 attacker_speed / np.where(target_speed == 0, 1.0, target_speed))
+        hp_damage = np.maximum(1, np.trunc(hp_damage * damage_factor))
+        armor_damage = np.maximum(0, np.trunc(armor_damage))
+
+        hb, ha, ht = b[hits], attacker[hits], target[hits]
+        self.stamina[hb, side, ha] -= 4
+        self.stamina[hb, enemy, ht] -= 4
+        self.hp[hb, enemy, ht] -= hp_damage[hits]
+        self.armor[hb, enemy, ht] -= armor_damage[hits]
+
+    def _special(self, side: int, attacker: np.ndarray, target: np.ndarray, acting: np.ndarray):
+        b = self._battle_index
+        enemy = 1 - side
+        count = self.ability_count[side, attacker]
+        pick = (self.rng.random(self.battles) * np.maximum(count, 1)).astype(np.int64)
+        code = self.ability_codes[side, attacker, pick]
+        cost = self.ability_costs[side, attacker, pick]
+        cast = acting & (count > 0) & (self.mp[b, side, attacker] >= cost)
+        self.mp[b[cast], side, attacker[cast]] -= cost[cast]
+        value = self.ability_values[side, attacker, pick]
+
+        def casting(name):
+            mask = cast & (code == ABILITY_CODES[name])
+            return b[mask], attacker[mask], target[mask], value[mask]
+
+        mb, ma, _, _ = casting('evasion')
+        self.evading_until[mb, side, ma] = self.turn_count + STATUS_DURATION
+
+        mb, ma, mt, mv = casting('critical strike')
+        self.hp[mb, enemy, mt] -= self.dmg[mb, side, ma] * mv
+
+        mb, _, mt, mv = casting('poison')
+        stack = self.poison_left[mb, enemy, mt].argmin(1)  # a free slot, see __init__
+        self.poison_value[mb, enemy, mt, stack] = mv
+        self.poison_left[mb, enemy, mt, stack] = POISON_DURATION
+
+        mb, _, mt, _ = casting('stun')
+        self.stunned_until[mb, enemy, mt] = self.turn_count + STATUS_DURATION
+
+        mb, ma, _, mv = casting('heal self')
+        self.hp[mb, side, ma] += mv
+
+        mb, _, _, mv = casting('heal others')
+        weakest = np.where(self.alive[mb, side], self.hp[mb, side], np.inf).argmin(1)
+        self.hp[mb, side, weakest] += mv
+
+        mb, ma, _, mv = casting('buff')
+        self.armor[mb, side, ma] += mv
+
+    def next_turn(self):
+        """Advance the turn and tick every active poison effect"""
+        self.turn_count += 1
+        ticking = (self.poison_left > 0) & self.running[:, None, None, None]
+        self.hp -= (self.poison_value * ticking).sum(-1)
+        self.poison_left -= ticking
+
+    def _settle(self, max_turns: int):
+        """Record the winner of every battle that ended this turn"""
+        defeated = ~self.alive.any(2)
+        team1_lost = self.running & defeated[:, 0]
+        team2_lost = self.running & ~defeated[:, 0] & defeated[:, 1]
+        self.winner[team1_lost] = 1
+        self.winner[team2_lost] = 0
+        finished = team1_lost | team2_lost
+        if self.turn_count >= max_turns:
+            # tie-break on live team rating, team2 wins ties like run_battle
+            unresolved = self.running & ~finished
+            rank = self.rank_offset + self.hp + self.armor
+            rating = (rank * self.alive).sum(2)
+            self.winner[unresolved] = np.where(rating[unresolved, 0] > rating[unresolved, 1], 0, 1)
+            finished |= unresolved
+        self.turns[finished] = self.turn_count
+        self.running &= ~finished
+
+    def run_battles(self, max_turns: int = 200) -> VectorBattleResults:
+        """Run every battle until one side is defeated or max_turns is reached"""
+        with np.errstate(divide='ignore', invalid='ignore'):
+            while self.running.any():
+                side = (self.turn_count - 1) % 2
+                for _ in range(self.moves_per_turn):
+                    self._move(side)
+                self.next_turn()
+                self._settle(max_turns)
+        surviving = np.maximum(self.hp, 0) * self.alive
+        return VectorBattleResults(self.winner, self.turns, surviving[:, 0].sum(1), surviving[:, 1].sum(1))
+
+
+def simulate_vectorized(team_a: Team, team_b: Team, n: int, seed: Optional[int] = None, max_turns: int = 200,
+                        moves_per_turn: int = 3, batch_size: int = 4096) -> VectorBattleResults:
+    """Run n battles of team_a against team_b through the vectorized kernel, batch_size at a time.
+
+    The teams are only read, never mutated, so the same Team objects can be reused.
+    """
+    seeds = np.random.SeedSequence(seed).spawn((n + batch_size - 1) // batch_size)
+    batches = []
+    for index, batch_seed in enumerate(seeds):
+        battles = min(batch_size, n - index * batch_size)
+        field = VectorBattleField(team_a, team_b, battles, moves_per_turn, batch_seed)
+        batches.append(field.run_battles(max_turns))
+    return VectorBattleResults(*(np.concatenate(column) for column in zip(*batches)))